@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Throughput of proxies shared by a growing number of threads.
+
+Run with a free-threaded build of CPython (python3.13t or newer) to see
+how reads and in-place updates scale across cores; on builds with the GIL
+throughput stays flat at best.
+
+    python benchmarks/contention.py [--threads 8] [--ops 200000]
+
+"""
+
+from __future__ import division, print_function, unicode_literals
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from pyoxy import ObjectProxy, ThreadSafeProxy
+
+
+class Target(object):
+
+    def __init__(self):
+        self.value = 1
+
+
+def read_attr(proxy, ops):
+    for _ in range(ops):
+        proxy.value
+
+
+def read_len(proxy, ops):
+    for _ in range(ops):
+        len(proxy)
+
+
+def add(proxy, ops):
+    for _ in range(ops):
+        proxy += 1
+
+
+BENCHMARKS = (
+    ('getattr', Target, read_attr),
+    ('len', lambda: [1, 2, 3], read_len),
+    ('+=', lambda: 0, add),
+)
+
+
+def run(proxy_class, make_target, fn, threads, ops):
+    """
+    Return operations per second of threads running fn on a shared proxy.
+
+    """
+    proxy = proxy_class(make_target())
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        fn(proxy, ops)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    if fn is add and proxy_class is ThreadSafeProxy:
+        assert proxy.__target__ == threads * ops, 'lost updates'
+    return threads * ops / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--ops', type=int, default=200000,
+                        help='operations per thread')
+    args = parser.parse_args()
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)
+    print('%s, GIL %s' % (sys.version.split()[0],
+                          'enabled' if is_gil_enabled() else 'disabled'))
+    counts = sorted(set([1, 2, 4, 8, 16, 32, 64]) & set(range(
+        1, args.threads + 1)) | set([args.threads]))
+    print('%-8s %-16s' % ('op', 'proxy') +
+          ''.join('%12s' % ('%d thr' % n) for n in counts))
+    for name, make_target, fn in BENCHMARKS:
+        for proxy_class in (ObjectProxy, ThreadSafeProxy):
+            print('%-8s %-16s' % (name, proxy_class.__name__) + ''.join(
+                '%12s' % ('%.2fM/s' % (
+                    run(proxy_class, make_target, fn, n, args.ops) / 1e6))
+                for n in counts), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,62 @@
 # -*- coding: utf-8 -*-
 
+import importlib
+import sys
+
 from .objectproxy import ObjectProxy
+
+
+# Names exported from submodules, imported on first access, so that
+# 'import pyoxy' costs only as much as ObjectProxy.
+_EXPORTS = {
+    'coalescing': ('AsyncCoalescingProxy', 'CoalescingProxy'),
+    'writebehind': ('WriteBehindProxy',),
+    'spill': ('SpillManager', 'SpillProxy', 'spill'),
+    'adaptive': ('AdaptiveProxy',),
+    'pool': ('PoolProxy', 'PoolTimeout'),
+    'lazy': ('LazyModule', 'LazyProxy', 'lazy_import'),
+    'sharedmemory': ('SharedMemoryProxy', 'share'),
+    'recording': ('Recorder', 'RecordingProxy', 'Replay', 'ReplayMiss',
+                  'ReplayProxy', 'record', 'replay'),
+    'reactive': ('ComputedProxy', 'SourceProxy'),
+    'memory': ('MemoryUsage', 'deep_sizeof', 'format_report',
+               'memory_report'),
+    'prefetch': ('AsyncPrefetcher', 'AsyncPrefetchProxy', 'Prefetcher',
+                 'PrefetchProxy'),
+    'pipeline': ('PipelineProxy',),
+    'bulk': ('del_many', 'get_many', 'set_many'),
+    'threadsafe': ('ThreadSafeProxy',),
+    'versioned': ('VersionedProxy',),
+    'serialize': ('JSONEncoder', 'dump_json', 'dump_msgpack', 'iter_json',
+                  'iter_msgpack', 'unwrap'),
+    'profiler': ('ProxyProfiler', 'signal_toggle'),
+    'deadline': ('DeadlineExceeded', 'DeadlineProxy', 'LatencyStats',
+                 'remaining'),
+}
+_modules = dict((name, module)
+                for module, names in _EXPORTS.items() for name in names)
+
+__all__ = ['ObjectProxy'] + sorted(_modules)
+
+
+def __getattr__(name):
+    module = _modules.get(name)
+    if module is None:
+        raise AttributeError('module %r has no attribute %r' %
+                             (__name__, name))
+    submodule = importlib.import_module('.' + module, __name__)
+    # Importing pyoxy.spill binds 'spill' to the submodule; rebind it.
+    for export in _EXPORTS[module]:
+        globals()[export] = getattr(submodule, export)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_modules))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # No module __getattr__ (PEP 562), so import everything now.
+    for _name in _modules:
+        __getattr__(_name)
+    del _name
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import weakref
+
+from .objectproxy import ObjectProxy, _compile_template, _unspecified
+
+
+# Reading the slot through its member descriptor skips proxy's Python level
+# __getattribute__, which is what every generic ObjectProxy method pays for
+# 'self.__target__'.
+_target = ObjectProxy.__target__.__get__
+
+# Operations specialized for a target type: parameters and the generic
+# expression used when the type has no such slot or the guard fails.
+FAST_OP_TEMPLATES = {
+    '__len__': ('', 'len(target)'),
+    '__iter__': ('', 'iter(target)'),
+    '__next__': ('', 'next(target)'),
+    'next': ('', 'next(target)'),
+    '__hash__': ('', 'hash(target)'),
+    '__bool__': ('', 'bool(target)'),
+    '__nonzero__': ('', 'bool(target)'),
+    '__repr__': ('', 'repr(target)'),
+    '__str__': ('', 'str(target)'),
+    '__contains__': (', item', 'item in target'),
+    '__getitem__': (', key', 'target[key]'),
+    '__setitem__': (', key, value', 'target.__setitem__(key, value)'),
+    '__delitem__': (', key', 'target.__delitem__(key)'),
+    '__call__': (', *args, **kwargs', 'target(*args, **kwargs)'),
+}
+BINARY_OPS = dict(
+    ('__%s__' % method, op)
+    for method, op in (
+        ('lt', '<'), ('le', '<='), ('eq', '=='), ('ne', '!='),
+        ('gt', '>'), ('ge', '>='),
+        ('add', '+'), ('sub', '-'), ('mul', '*'), ('truediv', '/'),
+        ('floordiv', '//'), ('mod', '%'), ('lshift', '<<'), ('rshift', '>>'),
+        ('and', '&'), ('xor', '^'), ('or', '|'),
+    ))
+FAST_OP_TEMPLATES.update(
+    (method, (', other', 'target %s other' % op))
+    for method, op in BINARY_OPS.items())
+
+# The guard protects against targets replaced bypassing __setattr__ (which
+# deoptimizes the proxy) and against changing their __class__.
+FAST_OP_METHOD_TEMPLATE = """
+def {method}(self{params}):
+    target = _target(self)
+    if type(target) is _type:
+        return _slot(target{params})
+    return {fallback}
+"""
+# Binary operations also defer to the full protocol for reflected
+# operations: when the slot returns NotImplemented, or when other is an
+# instance of a subclass (whose reflected method Python tries first).
+FAST_BINARY_OP_METHOD_TEMPLATE = """
+def {method}(self, other):
+    target = _target(self)
+    if type(target) is _type and (
+            type(other) is _type or not isinstance(other, _type)):
+        result = _slot(target, other)
+        if result is not NotImplemented:
+            return result
+    return {fallback}
+"""
+
+_OPS = tuple(sorted(name for name in FAST_OP_TEMPLATES
+                    if name in ObjectProxy.__dict__))
+
+_profiles = weakref.WeakKeyDictionary()
+_specializations = weakref.WeakKeyDictionary()
+
+
+def _fast_op(method, target_type):
+    """
+    Return method calling target_type's slot of it directly, or None if
+    target_type has no such slot.
+
+    """
+    slot = getattr(target_type, method, None)
+    if slot is None:
+        return None
+    params, fallback = FAST_OP_TEMPLATES[method]
+    template = FAST_BINARY_OP_METHOD_TEMPLATE if method in BINARY_OPS \
+        else FAST_OP_METHOD_TEMPLATE
+    namespace = {'_target': _target, '_type': target_type, '_slot': slot}
+    exec(_compile_template(template.format(
+        method=method, params=params, fallback=fallback),
+        'adaptive.%s' % method), namespace)
+    return namespace[method]
+
+
+def _counting_op(method):
+    generic = ObjectProxy.__dict__[method]
+
+    def op(self, *args, **kwargs):
+        self.__count__(method)
+        return generic(self, *args, **kwargs)
+    op.__name__ = str(method)
+    return op
+
+
+def _generic(cls):
+    """
+    Return the warm-up class of a (possibly specialized) proxy class.
+
+    """
+    return cls.__dict__.get('__generic__', cls)
+
+
+def profile(target_type):
+    """
+    Return counts of attributes and operations used on proxied instances
+    of target_type during warm-up.
+
+    """
+    return dict(_profiles.get(target_type, {}))
+
+
+def _specialization(generic, target_type, default):
+    return _specializations.get(target_type, {}).get(generic, default)
+
+
+def _specialize(generic, target_type):
+    """
+    Return subclass of generic (AdaptiveProxy or its subclass) with fast
+    paths for operations used on proxied instances of target_type.
+
+    """
+    cls = _specialization(generic, target_type, None)
+    if cls is None:
+        used = _profiles.get(target_type, {})
+        namespace = {'__slots__': (), '__generic__': generic,
+                     '__module__': generic.__module__}
+        for method in _OPS:
+            fast = _fast_op(method, target_type) if method in used else None
+            namespace[method] = ObjectProxy.__dict__[method] if fast is None \
+                else fast
+
+        def __getattribute__(self, attr):
+            if attr == '__ops__':
+                return object.__getattribute__(self, attr)
+            target = _target(self)
+            return target if attr == '__target__' else getattr(target, attr)
+        namespace['__getattribute__'] = __getattribute__
+
+        name = '%s[%s]' % (generic.__name__, target_type.__name__)
+        cls = _specializations.setdefault(target_type, {}).setdefault(
+            generic, type(str(name), (generic,), namespace))
+    return cls
+
+
+class AdaptiveProxy(ObjectProxy):
+    """
+    Proxy specializing itself for the operations it's actually used for.
+
+    During warm-up the proxy counts attribute reads and operations per type
+    of the target. After __warmup__ of them it switches its class to a
+    variant specialized for the target type: no counting, and operations
+    used during warm-up read the target slot directly instead of going
+    through the generic __getattribute__ and call the target type's method
+    (e.g. dict.__getitem__) bound at specialization time. Other operations
+    keep the generic ObjectProxy implementation.
+
+    Specializations are shared, so proxies of targets of an already
+    specialized type start specialized. Assigning a target of another type
+    deoptimizes the proxy back to warm-up (or to that type's
+    specialization).
+
+    """
+
+    __slots__ = ('__ops__',)
+
+    __warmup__ = 1000
+
+    def __init__(self, target=_unspecified):
+        self.__ops__ = 0
+        super(AdaptiveProxy, self).__init__(target)
+
+    def __getattribute__(self, attr):
+        if attr == '__ops__' or attr == '__count__':
+            return object.__getattribute__(self, attr)
+        target = object.__getattribute__(self, '__target__')
+        if attr == '__target__':
+            return target
+        object.__getattribute__(self, '__count__')(attr)
+        return getattr(target, attr)
+
+    def __setattr__(self, attr, value):
+        if attr == '__ops__':
+            object.__setattr__(self, attr, value)
+        elif attr == '__target__':
+            object.__setattr__(self, attr, value)
+            generic = _generic(type(self))
+            cls = _specialization(generic, type(value), generic)
+            if type(self) is not cls:
+                object.__setattr__(self, '__class__', cls)
+                object.__setattr__(self, '__ops__', 0)
+        else:
+            setattr(self.__target__, attr, value)
+
+    def __delattr__(self, attr):
+        if attr == '__target__':
+            object.__delattr__(self, attr)
+            object.__setattr__(self, '__class__', _generic(type(self)))
+            object.__setattr__(self, '__ops__', 0)
+        else:
+            delattr(self.__target__, attr)
+
+    def __count__(self, name):
+        target_type = type(object.__getattribute__(self, '__target__'))
+        counts = _profiles.get(target_type)
+        if counts is None:
+            counts = _profiles.setdefault(target_type, {})
+        counts[name] = counts.get(name, 0) + 1
+        ops = object.__getattribute__(self, '__ops__') + 1
+        object.__setattr__(self, '__ops__', ops)
+        if ops >= type(self).__warmup__:
+            object.__setattr__(
+                self, '__class__', _specialize(type(self), target_type))
+
+
+for _method in _OPS:
+    setattr(AdaptiveProxy, _method, _counting_op(_method))
+del _method
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import itertools
+import operator
+
+from .objectproxy import ObjectProxy, _unspecified
+
+try:  # pragma: no cover
+    from collections.abc import Mapping, MutableMapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping, MutableMapping
+
+
+def _unwrap(obj, method):
+    """
+    Return innermost target of a chain of proxies forwarding method (one of
+    item access methods) unchanged, so bulk operations can go straight to
+    it. Proxies overriding method (like WriteBehindProxy) are kept.
+
+    """
+    forwarding = getattr(ObjectProxy, method)
+    while isinstance(obj, ObjectProxy) and \
+            getattr(type(obj), method) is forwarding:
+        obj = obj.__target__
+    return obj
+
+
+def _is_array(obj):
+    return (not isinstance(obj, ObjectProxy) and
+            hasattr(obj, '__array_interface__') and hasattr(obj, 'ndim'))
+
+
+def _is_plain(obj, types):
+    """
+    Tell if obj is an instance of types and not a proxy (whose __class__
+    is that of its target, but whose methods may work differently).
+
+    """
+    return isinstance(obj, types) and not isinstance(obj, ObjectProxy)
+
+
+def _array_index(target, keys):
+    """
+    Return fancy index of keys of a numpy array: tuples of per-axis indices
+    of items of a multi-dimensional array are regrouped into a tuple of
+    index lists, one per axis.
+
+    """
+    keys = list(keys)
+    if target.ndim > 1 and all(isinstance(key, tuple) for key in keys):
+        if not keys:
+            return ([],) * target.ndim
+        return tuple(list(axis) for axis in zip(*keys))
+    return keys
+
+
+def _get(target, key, default):
+    try:
+        return target[key]
+    except (KeyError, IndexError):
+        return default
+
+
+def _indices(target, keys):
+    """
+    Return keys as non-negative indices of a list, if they are integers in
+    range, or None.
+
+    """
+    length = len(target)
+    indices = []
+    for key in keys:
+        if type(key) is not int:
+            return None
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            return None
+        indices.append(key)
+    return indices
+
+
+def get_many(obj, keys, default=_unspecified):
+    """
+    Return list of obj[key] for each of keys (or an array, for numpy
+    arrays). Items of multi-dimensional arrays are given by tuples of
+    indices.
+
+    Keys missing from obj (raising KeyError or IndexError) are returned as
+    default, if given; then numpy arrays are indexed key by key. Uses
+    operator.itemgetter, or fancy indexing for numpy arrays; proxies which
+    just forward item access are bypassed.
+
+    """
+    target = _unwrap(obj, '__getitem__')
+    if _is_array(target) and default is _unspecified:
+        return target[_array_index(target, keys)]
+    keys = keys if isinstance(keys, (list, tuple)) else list(keys)
+    if default is not _unspecified:
+        if _is_plain(target, Mapping):
+            return list(map(target.get, keys, itertools.repeat(default)))
+        return [_get(target, key, default) for key in keys]
+    if len(keys) == 1:
+        return [target[keys[0]]]
+    if not keys:
+        return []
+    return list(operator.itemgetter(*keys)(target))
+
+
+def set_many(obj, items):
+    """
+    Set obj[key] = value for each item of items, a mapping or an iterable
+    of (key, value) pairs.
+
+    Mappings are updated with update(), runs of consecutive indices of a
+    list with slice assignment and numpy arrays with fancy indexing (keys
+    of items of multi-dimensional arrays being tuples of indices); proxies
+    which just forward item assignment are bypassed.
+
+    """
+    target = _unwrap(obj, '__setitem__')
+    if _is_plain(target, MutableMapping):
+        target.update(items)
+        return
+    pairs = list(items.items() if isinstance(items, Mapping) else items)
+    if not pairs:
+        return
+    keys = [key for key, _ in pairs]
+    values = [value for _, value in pairs]
+    if _is_array(target):
+        target[_array_index(target, keys)] = values
+        return
+    if _is_plain(target, (list, bytearray)):
+        indices = _indices(target, keys)
+        if indices is not None:
+            start = indices[0]
+            if indices == list(range(start, start + len(indices))):
+                target[start:start + len(indices)] = values
+                return
+    for key, value in pairs:
+        target[key] = value
+
+
+def del_many(obj, keys):
+    """
+    Delete obj[key] for each of keys.
+
+    Indices of a list refer to its items before deletion and are deleted
+    from the highest, with slice deletion
+    when they're consecutive; proxies which just forward item deletion are
+    bypassed.
+
+    """
+    target = _unwrap(obj, '__delitem__')
+    keys = list(keys)
+    if _is_plain(target, (list, bytearray)):
+        indices = _indices(target, keys)
+        if indices is not None:
+            indices = sorted(set(indices), reverse=True)
+            if indices and indices[0] - indices[-1] == len(indices) - 1:
+                del target[indices[-1]:indices[0] + 1]
+            else:
+                for index in indices:
+                    del target[index]
+            return
+    for key in keys:
+        del target[key]
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import threading
+
+from .objectproxy import ObjectProxy, _proxy_own_attrs, _unspecified
+
+
+# Separates positional and keyword arguments in keys, can't be an argument.
+_KWARGS = object()
+
+
+def _typed(value):
+    """
+    Return value paired with its type (and those of items of tuples and
+    frozensets), so that equal values of different types, like 1, 1.0 and
+    True, give different keys.
+
+    """
+    value_type = type(value)
+    if value_type is tuple:
+        value = tuple(map(_typed, value))
+    elif value_type is frozenset:
+        value = frozenset(map(_typed, value))
+    return value_type, value
+
+
+def _call_key(args, kwargs):
+    """
+    Return hashable key of call arguments, raise TypeError if there is none.
+
+    """
+    key = tuple(map(_typed, args))
+    if kwargs:
+        key += (_KWARGS, frozenset((name, _typed(value))
+                                   for name, value in kwargs.items()))
+    hash(key)
+    return key
+
+
+class _Flight(object):
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class CoalescingProxy(ObjectProxy):
+    """
+    Proxy sharing a single in-flight call among concurrent identical calls.
+
+    Threads calling the proxy with equal arguments while a call is running
+    wait for that call and all receive its result or exception. Calls with
+    unhashable arguments go straight to the target.
+
+    """
+
+    __slots__ = ('__flights__', '__lock__')
+
+    __getattribute__, __setattr__, __delattr__ = _proxy_own_attrs(*__slots__)
+
+    def __init__(self, target=_unspecified):
+        super(CoalescingProxy, self).__init__(target)
+        self.__flights__ = {}
+        self.__lock__ = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = _call_key(args, kwargs)
+        except TypeError:
+            return self.__target__(*args, **kwargs)
+
+        flights = self.__flights__
+        with self.__lock__:
+            flight = flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = flights[key] = _Flight()
+        if not leader:
+            return flight.wait()
+
+        try:
+            flight.result = self.__target__(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.__lock__:
+                del flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class AsyncCoalescingProxy(ObjectProxy):
+    """
+    Proxy sharing a single in-flight call among concurrent identical calls
+    of a coroutine function (or any callable returning an awaitable).
+
+    Calls made while an identical call is pending return awaitables of the
+    same task. The task is shielded, so cancelling one of the waiters
+    doesn't cancel the call for the others. Must be called from a running
+    event loop.
+
+    """
+
+    __slots__ = ('__flights__',)
+
+    __getattribute__, __setattr__, __delattr__ = _proxy_own_attrs(*__slots__)
+
+    def __init__(self, target=_unspecified):
+        super(AsyncCoalescingProxy, self).__init__(target)
+        self.__flights__ = {}
+
+    def __call__(self, *args, **kwargs):
+        try:
+            key = _call_key(args, kwargs)
+        except TypeError:
+            return self.__target__(*args, **kwargs)
+
+        import asyncio
+        flights = self.__flights__
+        task = flights.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.__target__(*args, **kwargs))
+            flights[key] = task
+            task.add_done_callback(lambda _: flights.pop(key, None))
+        return asyncio.shield(task)
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import collections
+import math
+import threading
+import time
+
+from .coalescing import _call_key
+from .objectproxy import ObjectProxy
+
+
+# Flag of code of coroutine functions (inspect.CO_COROUTINE).
+_CO_COROUTINE = 0x80
+
+_clock = getattr(time, 'perf_counter', time.time)
+_local = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a call doesn't finish within its budget and there's
+    nothing to fall back to.
+
+    """
+
+
+def remaining():
+    """
+    Return seconds left of the budget of the call of a DeadlineProxy
+    running in this thread (or None, outside of such calls), for targets
+    to give up cooperatively.
+
+    """
+    deadline = getattr(_local, 'deadline', None)
+    return None if deadline is None else max(0.0, deadline - _clock())
+
+
+class LatencyStats(object):
+    """
+    Latencies of recent calls (up to window of them) and counts of
+    timeouts, by method name ('__call__' for calls of the target itself).
+
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.latencies = {}
+        self.timeouts = collections.Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            latencies = self.latencies.get(name)
+            if latencies is None:
+                latencies = self.latencies[name] = collections.deque(
+                    maxlen=self.window)
+            latencies.append(seconds)
+
+    def timeout(self, name):
+        with self._lock:
+            self.timeouts[name] += 1
+
+    def percentiles(self, name='__call__', percentiles=(50, 90, 99)):
+        """
+        Return dict of given percentiles of latencies of calls of name
+        (in seconds, empty if there were none).
+
+        """
+        with self._lock:
+            latencies = sorted(self.latencies.get(name, ()))
+        if not latencies:
+            return {}
+        n = len(latencies)
+        return dict((p, latencies[max(0, int(math.ceil(p / 100 * n)) - 1)])
+                    for p in percentiles)
+
+
+def _run(fn, args, kwargs, submitted, deadline, proxy, name, key):
+    """
+    Run a call of a DeadlineProxy in a worker thread, unless its budget ran
+    out while it was queued.
+
+    """
+    if _clock() >= deadline:
+        raise DeadlineExceeded('%s skipped, budget ran out in queue' % name)
+    _local.deadline = deadline
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        _local.deadline = None
+    object.__getattribute__(proxy, '__stats__').record(
+        name, _clock() - submitted)
+    object.__getattribute__(proxy, '__remember__')(key, result)
+    return result
+
+
+def _is_async(fn):
+    """
+    Tell if fn (or its __call__) is a coroutine function, without importing
+    asyncio.
+
+    """
+    for fn in (fn, getattr(fn, '__call__', None)):
+        code = getattr(getattr(fn, '__func__', fn), '__code__', None)
+        if code is not None and code.co_flags & _CO_COROUTINE:
+            return True
+    return False
+
+
+class _DeadlineMethod(object):
+    """
+    Method of the target of a DeadlineProxy, called within its budget.
+
+    """
+
+    __slots__ = ('proxy', 'name', 'fn')
+
+    def __init__(self, proxy, name, fn):
+        self.proxy = proxy
+        self.name = name
+        self.fn = fn
+
+    def __call__(self, *args, **kwargs):
+        return self.proxy.__invoke__(self.name, self.fn, args, kwargs)
+
+    def __repr__(self):
+        return '<deadline method %s>' % (self.name,)
+
+
+_OWN_ATTRS = frozenset((
+    '__budget__', '__fallback__', '__stale__', '__cache__', '__cache_size__',
+    '__max_workers__', '__executor__', '__stats__', '__lock__',
+    '__invoke__', '__invoke_async__', '__remember__', '__recall__',
+    '__shutdown__',
+))
+
+
+class DeadlineProxy(ObjectProxy):
+    """
+    Proxy calling its target (and methods of the target) within a time
+    budget of budget seconds.
+
+    Calls run in a thread pool (of max_workers threads) while the caller
+    waits up to the budget. Calls whose budget runs out while they're
+    queued are skipped; running ones can't be interrupted, but targets can
+    check remaining() and give up cooperatively. Coroutine functions are
+    awaited with asyncio.wait_for() instead, which cancels them when the
+    budget runs out.
+
+    When a call runs out of budget, the proxy falls back to the result of
+    the last successful call with equal arguments (if stale is true and
+    there's one among cache_size remembered), then to the same call on the
+    fallback target (if given), and raises DeadlineExceeded otherwise.
+    Exceptions raised by the target propagate as usual.
+
+    Latencies of calls and counts of timeouts are collected in
+    __stats__, a LatencyStats.
+
+    """
+
+    __slots__ = ('__budget__', '__fallback__', '__stale__', '__cache__',
+                 '__cache_size__', '__max_workers__', '__executor__',
+                 '__stats__', '__lock__')
+
+    def __init__(self, target, budget, fallback=None, stale=True,
+                 cache_size=1024, max_workers=None, window=1000):
+        super(DeadlineProxy, self).__init__(target)
+        self.__budget__ = budget
+        self.__fallback__ = fallback
+        self.__stale__ = stale
+        self.__cache__ = collections.OrderedDict()
+        self.__cache_size__ = cache_size
+        self.__max_workers__ = max_workers
+        self.__executor__ = None
+        self.__stats__ = LatencyStats(window)
+        self.__lock__ = threading.Lock()
+
+    def __getattribute__(self, attr):
+        if attr in _OWN_ATTRS:
+            return object.__getattribute__(self, attr)
+        target = object.__getattribute__(self, '__target__')
+        if attr == '__target__':
+            return target
+        value = getattr(target, attr)
+        if callable(value) and not isinstance(value, type):
+            return _DeadlineMethod(self, attr, value)
+        return value
+
+    def __setattr__(self, attr, value):
+        if attr in _OWN_ATTRS or attr == '__target__':
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.__target__, attr, value)
+
+    def __call__(self, *args, **kwargs):
+        return self.__invoke__('__call__', self.__target__, args, kwargs)
+
+    def __remember__(self, key, result):
+        if key is None:
+            return
+        with self.__lock__:
+            cache = self.__cache__
+            cache[key] = result
+            cache.move_to_end(key)
+            if len(cache) > self.__cache_size__:
+                cache.popitem(last=False)
+
+    def __recall__(self, name, key, args, kwargs):
+        """
+        Return what a call out of budget falls back to.
+
+        """
+        self.__stats__.timeout(name)
+        if key is not None:
+            with self.__lock__:
+                try:
+                    return self.__cache__[key]
+                except KeyError:
+                    pass
+        fallback = self.__fallback__
+        if fallback is None:
+            raise DeadlineExceeded('%s exceeded its budget of %gs' %
+                                   (name, self.__budget__))
+        if name != '__call__':
+            fallback = getattr(fallback, name)
+        return fallback(*args, **kwargs)
+
+    def __invoke__(self, name, fn, args, kwargs):
+        key = None
+        if self.__stale__:
+            try:
+                key = (name, _call_key(args, kwargs))
+            except TypeError:
+                pass
+        if _is_async(fn):
+            return self.__invoke_async__(name, fn, args, kwargs, key)
+
+        from concurrent import futures
+        submitted = _clock()
+        deadline = submitted + self.__budget__
+        executor = self.__executor__
+        if executor is None:
+            with self.__lock__:
+                executor = self.__executor__
+                if executor is None:
+                    executor = self.__executor__ = futures.ThreadPoolExecutor(
+                        self.__max_workers__)
+        future = executor.submit(_run, fn, args, kwargs, submitted, deadline,
+                                 self, name, key)
+        try:
+            return future.result(max(0.0, deadline - _clock()))
+        except (futures.TimeoutError, DeadlineExceeded):
+            future.cancel()
+        return self.__recall__(name, key, args, kwargs)
+
+    def __invoke_async__(self, name, fn, args, kwargs, key):
+        import asyncio
+        loop = asyncio.get_event_loop()
+        outer = loop.create_future()
+        submitted = _clock()
+        task = asyncio.ensure_future(
+            asyncio.wait_for(fn(*args, **kwargs), self.__budget__))
+
+        def resolve(value):
+            if asyncio.isfuture(value) or asyncio.iscoroutine(value):
+                asyncio.ensure_future(value).add_done_callback(copy)
+            else:
+                outer.set_result(value)
+
+        def copy(future):
+            if outer.done():
+                return
+            if future.cancelled():
+                outer.cancel()
+            elif future.exception() is not None:
+                outer.set_exception(future.exception())
+            else:
+                outer.set_result(future.result())
+
+        def done(task):
+            if outer.done():
+                return
+            if task.cancelled():
+                outer.cancel()
+                return
+            error = task.exception()
+            if error is None:
+                self.__stats__.record(name, _clock() - submitted)
+                self.__remember__(key, task.result())
+                outer.set_result(task.result())
+            elif isinstance(error, asyncio.TimeoutError):
+                try:
+                    resolve(self.__recall__(name, key, args, kwargs))
+                except Exception as e:
+                    outer.set_exception(e)
+            else:
+                outer.set_exception(error)
+
+        task.add_done_callback(done)
+        outer.add_done_callback(lambda _: outer.cancelled() and task.cancel())
+        return outer
+
+    def __shutdown__(self, wait=True):
+        """
+        Shut down the thread pool (a new one is started by the next call).
+
+        """
+        with self.__lock__:
+            executor, self.__executor__ = self.__executor__, None
+        if executor is not None:
+            executor.shutdown(wait)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import importlib
+import sys
+import threading
+import time
+
+from .objectproxy import ObjectProxy
+
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+# Seconds spent importing each module resolved by a LazyModule.
+import_times = {}
+
+_OWN_ATTRS = frozenset((
+    '__factory__', '__lock__', '__resolve__', '__unresolved__',
+    '__import_module__',
+))
+
+
+class LazyProxy(ObjectProxy):
+    """
+    Proxy resolving its target with factory() on first access.
+
+    Resolution is thread-safe: concurrent first accesses wait for a single
+    factory() call. If it raises, the exception propagates and the next
+    access tries again. Assigning __target__ directly skips resolution.
+
+    """
+
+    __slots__ = ('__factory__', '__lock__')
+
+    def __init__(self, factory):
+        self.__factory__ = factory
+        self.__lock__ = threading.RLock()
+
+    def __getattribute__(self, attr):
+        if attr in _OWN_ATTRS:
+            return object.__getattribute__(self, attr)
+        try:
+            target = object.__getattribute__(self, '__target__')
+        except AttributeError:
+            return object.__getattribute__(self, '__unresolved__')(attr)
+        return target if attr == '__target__' else getattr(target, attr)
+
+    def __setattr__(self, attr, value):
+        if attr in _OWN_ATTRS or attr == '__target__':
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.__target__, attr, value)
+
+    def __delattr__(self, attr):
+        if attr in _OWN_ATTRS or attr == '__target__':
+            object.__delattr__(self, attr)
+        else:
+            delattr(self.__target__, attr)
+
+    def __unresolved__(self, attr):
+        """
+        Handle access to attr before the target is resolved.
+
+        """
+        target = self.__resolve__()
+        return target if attr == '__target__' else getattr(target, attr)
+
+    def __resolve__(self):
+        """
+        Return the target, calling factory() if it's not resolved yet.
+
+        """
+        with self.__lock__:
+            try:
+                return object.__getattribute__(self, '__target__')
+            except AttributeError:
+                pass
+            target = self.__factory__()
+            object.__setattr__(self, '__target__', target)
+            return target
+
+
+class LazyModule(LazyProxy):
+    """
+    Stand-in for a module, importing it on first attribute access.
+
+    If the proxy is registered in sys.modules (see lazy_import()), the
+    real module replaces it there once imported. Import time is recorded
+    in import_times.
+
+    Until then the proxy's __spec__ is None. Import statements check
+    __spec__ of modules found in sys.modules, so they return the proxy
+    without importing the module.
+
+    """
+
+    __slots__ = ()
+
+    def __init__(self, name):
+        super(LazyModule, self).__init__(lambda: self.__import_module__(name))
+
+    def __unresolved__(self, attr):
+        if attr == '__spec__':
+            return None
+        return super(LazyModule, self).__unresolved__(attr)
+
+    def __import_module__(self, name):
+        if sys.modules.get(name) is self:
+            del sys.modules[name]
+        start = _clock()
+        try:
+            module = importlib.import_module(name)
+        except BaseException:
+            sys.modules.setdefault(name, self)
+            raise
+        import_times[name] = _clock() - start
+        return module
+
+
+def lazy_import(name):
+    """
+    Return module name, deferring its import until first attribute access.
+
+    Already imported modules are returned as they are. Otherwise
+    a LazyModule is registered in sys.modules, so later imports of name
+    get it too until the real module replaces it.
+
+    """
+    module = sys.modules.get(name)
+    if module is None:
+        module = sys.modules.setdefault(name, LazyModule(name))
+    return module
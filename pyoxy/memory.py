@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import gc
+import sys
+import types
+
+from .objectproxy import ObjectProxy
+
+
+# Shared by everything which refers to them, so never attributed to anyone.
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType,
+                 types.BuiltinFunctionType)
+
+_GC_OVERHEAD = sys.getsizeof([]) - [].__sizeof__()
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Return size of obj and all objects reachable from it.
+
+    Objects whose ids are in seen aren't counted again; seen is updated
+    with counted ones. Classes, modules and functions aren't counted.
+
+    """
+    return _deep_sizeof(obj, set() if seen is None else seen, True)
+
+
+def _deep_sizeof(obj, seen, targets):
+    """
+    Return deep size of obj, with targets of proxies reached or not.
+
+    """
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or issubclass(type(obj), _SHARED_TYPES):
+            continue
+        seen.add(id(obj))
+        if issubclass(type(obj), ObjectProxy):
+            size += _shell_sizeof(obj)
+            if not targets:
+                stack.extend(_proxy_state(obj))
+                continue
+        else:
+            size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def _shell_sizeof(proxy):
+    """
+    Return size of the proxy object alone, without its target.
+
+    """
+    size = object.__sizeof__(proxy)
+    return size + _GC_OVERHEAD if gc.is_tracked(proxy) else size
+
+
+def _proxy_state(proxy):
+    """
+    Return values of proxy's slots (other than __target__) and __dict__.
+
+    """
+    state = []
+    for cls in type(proxy).__mro__:
+        slots = cls.__dict__.get('__slots__', ())
+        if isinstance(slots, (type(''), str)):
+            slots = (slots,)
+        for name in slots:
+            if name in ('__target__', '__weakref__'):
+                continue
+            try:
+                state.append(object.__getattribute__(proxy, name))
+            except AttributeError:
+                pass
+    try:
+        state.append(object.__getattribute__(proxy, '__dict__'))
+    except AttributeError:
+        pass
+    return state
+
+
+class MemoryUsage(object):
+    """
+    Memory used by proxies of targets of one type.
+
+    proxy_bytes covers proxy objects and their own state (e.g. buffers of
+    a WriteBehindProxy), target_bytes covers targets and everything
+    reachable from them. Shared objects are counted once, for the first
+    proxy reaching them.
+
+    """
+
+    __slots__ = ('proxies', 'targets', 'proxy_bytes', 'target_bytes')
+
+    def __init__(self):
+        self.proxies = 0
+        self.targets = 0
+        self.proxy_bytes = 0
+        self.target_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self.proxy_bytes + self.target_bytes
+
+    def __repr__(self):
+        return ('MemoryUsage(proxies=%d, targets=%d, proxy_bytes=%d, '
+                'target_bytes=%d)' % (self.proxies, self.targets,
+                                      self.proxy_bytes, self.target_bytes))
+
+
+def memory_report(proxies, deep=True):
+    """
+    Return dict of MemoryUsage of given proxies by type of their targets.
+
+    Chains of proxies are followed to the innermost target; proxies in the
+    chain count as proxy overhead. Targets shared by several proxies are
+    counted once. With deep=False only shallow sizes of targets are taken.
+    Proxies without a target (like not yet loaded lazy proxies) are
+    reported under None.
+
+    """
+    report = {}
+    seen = set()
+    for proxy in proxies:
+        proxy_bytes = 0
+        target = proxy
+        unset = False
+        while issubclass(type(target), ObjectProxy):
+            if id(target) not in seen:
+                seen.add(id(target))
+                proxy_bytes += _shell_sizeof(target)
+                # Proxies in the state (like sources of a ComputedProxy)
+                # count without their targets, left to their own types.
+                for value in _proxy_state(target):
+                    proxy_bytes += _deep_sizeof(value, seen, False)
+            try:
+                target = object.__getattribute__(target, '__target__')
+            except AttributeError:
+                unset = True
+                break
+        key = None if unset else type(target)
+
+        usage = report.get(key)
+        if usage is None:
+            usage = report[key] = MemoryUsage()
+        usage.proxies += 1
+        usage.proxy_bytes += proxy_bytes
+        if not unset and id(target) not in seen:
+            usage.targets += 1
+            if deep:
+                usage.target_bytes += deep_sizeof(target, seen)
+            else:
+                seen.add(id(target))
+                usage.target_bytes += sys.getsizeof(target)
+    return report
+
+
+def format_report(report):
+    """
+    Return memory report as a text table, largest totals first.
+
+    """
+    lines = ['%-30s %10s %10s %14s %14s' % (
+        'target type', 'proxies', 'targets', 'proxy bytes', 'target bytes')]
+    for key, usage in sorted(report.items(),
+                             key=lambda item: -item[1].total_bytes):
+        name = 'None' if key is None else '%s.%s' % (key.__module__,
+                                                      key.__name__)
+        lines.append('%-30s %10d %10d %14d %14d' % (
+            name, usage.proxies, usage.targets, usage.proxy_bytes,
+            usage.target_bytes))
+    return '\n'.join(lines)
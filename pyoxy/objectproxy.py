@@ -16,7 +16,9 @@
 
 from __future__ import division, unicode_literals
 
+import linecache
 import operator
+import sys
 
 
 try:  # pragma: no cover
@@ -52,8 +54,23 @@ def __i{method}__(self, other):
 """
 
 
+def _compile_template(source, name):
+    """
+    Compile generated code under a file name telling it apart (in profiles
+    and tracebacks), '<pyoxy.NAME>', with its source available to
+    linecache.
+
+    """
+    filename = '<pyoxy.{0}>'.format(name)
+    linecache.cache[filename] = (
+        len(source), None, source.splitlines(True), filename)
+    return compile(source, filename, 'exec')
+
+
 def _proxy_unary_op(method, op):
-    return UNARY_OP_METHOD_TEMPLATE.format(method=method, op=op)
+    return _compile_template(
+        UNARY_OP_METHOD_TEMPLATE.format(method=method, op=op),
+        'objectproxy.__%s__' % method)
 
 
 def _proxy_binary_op(method, op, r=False, i=False):
@@ -62,7 +79,38 @@ def _proxy_binary_op(method, op, r=False, i=False):
         template += BINARY_R_OP_METHOD_TEMPLATE
     if i:
         template += BINARY_I_OP_METHOD_TEMPLATE
-    return template.format(method=method, op=op)
+    return _compile_template(template.format(method=method, op=op),
+                             'objectproxy.__%s__' % method)
+
+
+def _proxy_own_attrs(*attrs):
+    """
+    Create attribute access methods for an ObjectProxy subclass.
+
+    Returned __getattribute__, __setattr__ and __delattr__ keep '__target__'
+    and given attrs on the proxy itself and forward everything else.
+
+    """
+    own = frozenset(('__target__',) + attrs)
+
+    def __getattribute__(self, attr):
+        if attr in own:
+            return object.__getattribute__(self, attr)
+        return getattr(object.__getattribute__(self, '__target__'), attr)
+
+    def __setattr__(self, attr, value):
+        if attr in own:
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.__target__, attr, value)
+
+    def __delattr__(self, attr):
+        if attr in own:
+            object.__delattr__(self, attr)
+        else:
+            delattr(self.__target__, attr)
+
+    return __getattribute__, __setattr__, __delattr__
 
 
 class ObjectProxy(object):
@@ -111,6 +159,21 @@ class ObjectProxy(object):
     def __format__(self, format_spec):
         return format(self.__target__, format_spec)
 
+    def __sizeof__(self):
+        """
+        Handle 'sys.getsizeof(ObjectProxy(target))'.
+
+        Size of the proxy plus (shallow) size of its target. Doesn't
+        resolve targets of lazy proxies.
+
+        """
+        size = object.__sizeof__(self)
+        try:
+            target = object.__getattribute__(self, '__target__')
+        except AttributeError:
+            return size
+        return size + sys.getsizeof(target)
+
     exec(_proxy_binary_op('lt', '<'))
     exec(_proxy_binary_op('le', '<='))
     exec(_proxy_binary_op('eq', '=='))
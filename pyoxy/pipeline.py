@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import itertools
+
+from .objectproxy import (
+    ObjectProxy, _compile_template, _proxy_own_attrs, _unspecified)
+
+
+# Element-wise stages, fused into a single loop.
+STAGE_TEMPLATES = {
+    'map': """
+        item = {fn}(item)""",
+    'filter': """
+        if not {fn}(item):
+            continue""",
+    'mask': """
+        item = item[{fn}(item)]""",
+}
+FUSED_LOOP_TEMPLATE = """
+def fused(source, {fns}):
+    for item in source:{stages}
+        yield item
+"""
+
+_fused_loops = {}
+
+
+def _fused_loop(kinds):
+    """
+    Return generator function running element-wise stages of given kinds
+    in a single loop, compiled on first use.
+
+    """
+    loop = _fused_loops.get(kinds)
+    if loop is None:
+        fns = ['fn%d' % i for i in range(len(kinds))]
+        code = FUSED_LOOP_TEMPLATE.format(
+            fns=', '.join(fns),
+            stages=''.join(STAGE_TEMPLATES[kind].format(fn=fn)
+                           for kind, fn in zip(kinds, fns)))
+        namespace = {}
+        exec(_compile_template(code, 'pipeline.fused.' + '.'.join(kinds)),
+             namespace)
+        loop = _fused_loops[kinds] = namespace['fused']
+    return loop
+
+
+def _batch(source, size):
+    source = iter(source)
+    while True:
+        batch = list(itertools.islice(source, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _chunk(source, size, dtype):
+    import numpy
+    for batch in _batch(source, size):
+        yield numpy.asarray(batch, dtype)
+
+
+def _run(source, stages):
+    """
+    Return iterator of source passed through stages.
+
+    """
+    i = 0
+    while i < len(stages):
+        kind, args = stages[i]
+        if kind in STAGE_TEMPLATES:
+            j = i + 1
+            while j < len(stages) and stages[j][0] in STAGE_TEMPLATES:
+                j += 1
+            fused = stages[i:j]
+            source = _fused_loop(tuple(kind for kind, _ in fused))(
+                source, *[args for _, args in fused])
+            i = j
+            continue
+        if kind == 'take':
+            source = itertools.islice(source, args)
+        elif kind == 'batch':
+            source = _batch(source, args)
+        else:
+            source = _chunk(source, *args)
+        i += 1
+    return iter(source)
+
+
+class PipelineProxy(ObjectProxy):
+    """
+    Proxy of an iterable with a lazy pipeline of stages.
+
+    __map__(), __filter__(), __take__(), __batch__() and __chunk__() return
+    a new PipelineProxy of the same target with the stage appended, without
+    iterating anything. Iterating the proxy runs the pipeline: consecutive
+    map and filter stages are fused into a single generated loop, so a
+    pipeline costs one generator frame per item however many of them it
+    has.
+
+    __chunk__() groups items into numpy arrays; stages after it get whole
+    arrays, so functions mapped over them run vectorized, and filters with
+    vectorized=True select array elements with boolean masks returned by
+    their predicates.
+
+    'in' runs the pipeline too. len(), reversed(), item access and next()
+    raise TypeError on a proxy with stages, rather than giving results of
+    the target which the stages would change; attributes are those of the
+    target.
+
+    """
+
+    __slots__ = ('__stages__',)
+
+    __getattribute__, __setattr__, __delattr__ = _proxy_own_attrs(
+        '__stages__', '__stage__', '__map__', '__filter__', '__take__',
+        '__batch__', '__chunk__')
+
+    def __init__(self, target=_unspecified, stages=()):
+        super(PipelineProxy, self).__init__(target)
+        self.__stages__ = stages
+
+    def __stage__(self, kind, args):
+        return type(self)(self.__target__, self.__stages__ + ((kind, args),))
+
+    def __map__(self, fn):
+        """
+        Apply fn to each item.
+
+        """
+        return self.__stage__('map', fn)
+
+    def __filter__(self, predicate, vectorized=False):
+        """
+        Keep items for which predicate is true (or, if vectorized, elements
+        of array items selected by the mask it returns).
+
+        """
+        return self.__stage__('mask' if vectorized else 'filter', predicate)
+
+    def __take__(self, n):
+        """
+        Stop after n items.
+
+        """
+        return self.__stage__('take', n)
+
+    def __batch__(self, size):
+        """
+        Group items into lists of size items (the last one may be shorter).
+
+        """
+        if size < 1:
+            raise ValueError('batch size must be positive')
+        return self.__stage__('batch', size)
+
+    def __chunk__(self, size, dtype=None):
+        """
+        Group items into numpy arrays of size items (the last one may be
+        shorter).
+
+        """
+        if size < 1:
+            raise ValueError('chunk size must be positive')
+        return self.__stage__('chunk', (size, dtype))
+
+    def __iter__(self):
+        return _run(self.__target__, self.__stages__)
+
+    def __contains__(self, item):
+        if not self.__stages__:
+            return item in self.__target__
+        return item in iter(self)
+
+
+def _unstaged(method):
+    """
+    Return method of the target, unsupported on a proxy with stages.
+
+    """
+    generic = ObjectProxy.__dict__[method]
+
+    def op(self, *args):
+        if self.__stages__:
+            raise TypeError('%s of a pipeline with stages is not supported, '
+                            'iterate it instead' % (method,))
+        return generic(self, *args)
+    op.__name__ = str(method)
+    return op
+
+for _name in ('__len__', '__getitem__', '__reversed__', '__next__', 'next'):
+    if _name in ObjectProxy.__dict__:
+        setattr(PipelineProxy, _name, _unstaged(_name))
+del _name
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import contextlib
+import random
+import threading
+import time
+
+from .objectproxy import ObjectProxy
+
+
+POLICIES = ('round_robin', 'least_loaded', 'random')
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no pooled target becomes available in time.
+
+    """
+
+
+class _Entry(object):
+
+    __slots__ = ('target', 'load')
+
+    def __init__(self, target):
+        self.target = target
+        self.load = 0
+
+
+class _PooledMethod(object):
+    """
+    Method of pooled targets, called on a target checked out per call.
+
+    """
+
+    __slots__ = ('pool', 'name')
+
+    def __init__(self, pool, name):
+        self.pool = pool
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        with self.pool.__checkout__() as target:
+            return getattr(target, self.name)(*args, **kwargs)
+
+    def __repr__(self):
+        return '<pooled method %s>' % (self.name,)
+
+
+_OWN_ATTRS = frozenset((
+    '__entries__', '__factory__', '__size__', '__max_uses__', '__policy__',
+    '__timeout__', '__healthy__', '__eject_on__', '__dispose__',
+    '__cursor__', '__creating__', '__cond__', '__local__',
+    '__checkout__', '__acquire__', '__release__', '__select__', '__eject__',
+))
+
+
+class PoolProxy(ObjectProxy):
+    """
+    Proxy fronting a pool of interchangeable targets.
+
+    Every call, method call and attribute read checks out one target,
+    chosen by policy ('round_robin', 'least_loaded' or 'random') among
+    targets used by less than max_uses callers, and returns it afterwards.
+    A 'with' block keeps one target checked out for the current thread:
+    it's what 'with' binds (or what its __enter__ returns, for context
+    managers) and what __target__ and all other operations on the proxy
+    use inside the block. Outside of 'with' blocks __target__ isn't set.
+
+    The pool starts with given targets and, if factory is given, grows
+    with factory() up to size targets when all are busy. Size defaults to
+    the number of given targets and must be positive, so it's required
+    when starting with a factory alone. Callers wait up to timeout seconds
+    (None means forever) for a target, then PoolTimeout is raised.
+
+    A target is ejected from the pool (and passed to dispose, if given)
+    when healthy(target) returns false on checkout, or when using it
+    raises one of eject_on exceptions. Exceptions raised by healthy()
+    propagate to the caller; the target is ejected if they're eject_on
+    exceptions and returned to the pool otherwise.
+
+    """
+
+    __slots__ = ('__entries__', '__factory__', '__size__', '__max_uses__',
+                 '__policy__', '__timeout__', '__healthy__', '__eject_on__',
+                 '__dispose__', '__cursor__', '__creating__', '__cond__',
+                 '__local__')
+
+    def __init__(self, targets=(), factory=None, size=None, max_uses=1,
+                 policy='round_robin', timeout=None, healthy=None,
+                 eject_on=(), dispose=None):
+        if policy not in POLICIES:
+            raise ValueError('unknown policy: %r' % (policy,))
+        entries = [_Entry(target) for target in targets]
+        if size is None:
+            size = len(entries)
+        if size < 1:
+            raise ValueError('pool size must be positive (pass size with '
+                             'factory and no targets)')
+        self.__entries__ = entries
+        self.__factory__ = factory
+        self.__size__ = size
+        self.__max_uses__ = max_uses
+        self.__policy__ = policy
+        self.__timeout__ = timeout
+        self.__healthy__ = healthy
+        self.__eject_on__ = tuple(eject_on)
+        self.__dispose__ = dispose
+        self.__cursor__ = 0
+        self.__creating__ = 0
+        self.__cond__ = threading.Condition()
+        self.__local__ = threading.local()
+
+    def __getattribute__(self, attr):
+        if attr in _OWN_ATTRS:
+            return object.__getattribute__(self, attr)
+        stack = getattr(object.__getattribute__(self, '__local__'),
+                        'stack', None)
+        if stack:
+            target = stack[-1].target
+            return target if attr == '__target__' else getattr(target, attr)
+        if attr == '__target__':
+            raise AttributeError(
+                'pooled targets are only available in a with block')
+        # Methods are looked up on a target's type, without checking it out.
+        with object.__getattribute__(self, '__cond__'):
+            entries = object.__getattribute__(self, '__entries__')
+            sample = entries[0].target if entries else None
+        if sample is not None and callable(getattr(type(sample), attr, None)):
+            return _PooledMethod(self, attr)
+        with object.__getattribute__(self, '__checkout__')() as target:
+            value = getattr(target, attr)
+        return _PooledMethod(self, attr) if callable(value) else value
+
+    def __setattr__(self, attr, value):
+        if attr in _OWN_ATTRS:
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.__target__, attr, value)
+
+    def __delattr__(self, attr):
+        if attr in _OWN_ATTRS:
+            object.__delattr__(self, attr)
+        else:
+            delattr(self.__target__, attr)
+
+    def __select__(self):
+        """
+        Return entry to check out next or None if all are busy.
+
+        Must be called with __cond__ held.
+
+        """
+        entries = self.__entries__
+        max_uses = self.__max_uses__
+        if self.__policy__ == 'round_robin':
+            count = len(entries)
+            for i in range(count):
+                index = (self.__cursor__ + i) % count
+                if entries[index].load < max_uses:
+                    self.__cursor__ = index + 1
+                    return entries[index]
+            return None
+        available = [entry for entry in entries if entry.load < max_uses]
+        if not available:
+            return None
+        if self.__policy__ == 'least_loaded':
+            return min(available, key=lambda entry: entry.load)
+        return random.choice(available)
+
+    def __acquire__(self):
+        """
+        Check out an entry, waiting for one up to the pool's timeout.
+
+        """
+        timeout = self.__timeout__
+        deadline = None if timeout is None else time.time() + timeout
+        cond = self.__cond__
+        while True:
+            create = False
+            with cond:
+                while True:
+                    entry = self.__select__()
+                    if entry is not None:
+                        entry.load += 1
+                        break
+                    if self.__factory__ is not None and \
+                            len(self.__entries__) + self.__creating__ < \
+                            self.__size__:
+                        self.__creating__ += 1
+                        create = True
+                        break
+                    remaining = None if deadline is None \
+                        else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise PoolTimeout(
+                            'no pooled target available in %ss' % timeout)
+                    cond.wait(remaining)
+
+            if create:
+                try:
+                    entry = _Entry(self.__factory__())
+                except BaseException:
+                    with cond:
+                        self.__creating__ -= 1
+                        cond.notify()
+                    raise
+                entry.load = 1
+                with cond:
+                    self.__creating__ -= 1
+                    self.__entries__.append(entry)
+                return entry
+
+            healthy = self.__healthy__
+            if healthy is None:
+                return entry
+            try:
+                ok = healthy(entry.target)
+            except self.__eject_on__:
+                self.__release__(entry, eject=True)
+                raise
+            except BaseException:
+                self.__release__(entry)
+                raise
+            if ok:
+                return entry
+            self.__release__(entry, eject=True)
+
+    def __release__(self, entry, eject=False):
+        """
+        Return checked out entry to the pool or eject it.
+
+        """
+        with self.__cond__:
+            entry.load -= 1
+            if eject:
+                try:
+                    self.__entries__.remove(entry)
+                except ValueError:  # already ejected
+                    eject = False
+            self.__cond__.notify()
+        if eject and self.__dispose__ is not None:
+            self.__dispose__(entry.target)
+
+    def __eject__(self, target):
+        """
+        Remove target from the pool.
+
+        """
+        with self.__cond__:
+            for entry in self.__entries__:
+                if entry.target is target:
+                    self.__entries__.remove(entry)
+                    self.__cond__.notify_all()
+                    break
+            else:
+                return
+        if self.__dispose__ is not None:
+            self.__dispose__(target)
+
+    @contextlib.contextmanager
+    def __checkout__(self):
+        """
+        Check out a target for the duration of a 'with' block.
+
+        """
+        entry = self.__acquire__()
+        try:
+            yield entry.target
+        except self.__eject_on__:
+            self.__release__(entry, eject=True)
+            raise
+        except BaseException:
+            self.__release__(entry)
+            raise
+        else:
+            self.__release__(entry)
+
+    def __call__(self, *args, **kwargs):
+        stack = getattr(self.__local__, 'stack', None)
+        if stack:
+            return stack[-1].target(*args, **kwargs)
+        with self.__checkout__() as target:
+            return target(*args, **kwargs)
+
+    def __enter__(self):
+        local = self.__local__
+        if not hasattr(local, 'stack'):
+            local.stack = []
+        entry = self.__acquire__()
+        local.stack.append(entry)
+        target = entry.target
+        if hasattr(type(target), '__enter__'):
+            try:
+                return target.__enter__()
+            except BaseException:
+                local.stack.pop()
+                self.__release__(entry)
+                raise
+        return target
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        entry = self.__local__.stack.pop()
+        target = entry.target
+        try:
+            if hasattr(type(target), '__exit__'):
+                return target.__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.__release__(entry, eject=exc_type is not None and
+                             issubclass(exc_type, self.__eject_on__))
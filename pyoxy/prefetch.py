@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import collections
+import threading
+import weakref
+
+from .objectproxy import ObjectProxy, _proxy_own_attrs, _unspecified
+
+
+_ITEMS = 0
+_DONE = 1
+_ERROR = 2
+
+
+class _Chunks(object):
+    """
+    Bounded queue of chunks, shared by a Prefetcher and its thread (which
+    doesn't keep the Prefetcher alive, so it gets closed when abandoned).
+
+    """
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.chunks = collections.deque()
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def put(self, kind, payload):
+        with self.cond:
+            while len(self.chunks) >= self.depth and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return False
+            self.chunks.append((kind, payload))
+            self.cond.notify_all()
+            return True
+
+    def get(self):
+        with self.cond:
+            while not self.chunks and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return _DONE, None
+            self.cond.notify_all()
+            return self.chunks.popleft()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.chunks.clear()
+            self.cond.notify_all()
+
+
+def _produce(chunks, iterable, chunk_size):
+    try:
+        it = iter(iterable)
+    except BaseException as e:
+        chunks.put(_ERROR, e)
+        return
+    try:
+        chunk = []
+        for item in it:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                if not chunks.put(_ITEMS, chunk):
+                    break
+                chunk = []
+            elif chunks.closed:
+                break
+        else:
+            if not chunk or chunks.put(_ITEMS, chunk):
+                chunks.put(_DONE, None)
+            return
+    except BaseException as e:
+        chunks.put(_ERROR, e)
+        return
+    # Stopped by close(): close the abandoned iterator. Exhausted ones (like
+    # the caller's files or cursors) are left open.
+    close = getattr(it, 'close', None)
+    if close is not None:
+        close()
+
+
+class Prefetcher(object):
+    """
+    Iterator producing items of iterable in a background thread.
+
+    Items are produced in chunks of chunk_size and at most depth chunks
+    are buffered ahead of the consumer. Exceptions raised by the iterable
+    are re-raised by the consumer after the items produced before them.
+    close() (or garbage collection) stops production, closing the iterable
+    after its current item if it has close(), and ends the iteration.
+    Iterables consumed to the end aren't closed.
+
+    Can be consumed with async for as well, blocking a thread of the
+    default executor while waiting for a chunk; cancelling a pending
+    __anext__() closes the iterator.
+
+    """
+
+    def __init__(self, iterable, depth=16, chunk_size=1):
+        if depth < 1 or chunk_size < 1:
+            raise ValueError('depth and chunk_size must be positive')
+        self._chunks = _Chunks(depth)
+        self._chunk = ()
+        self._index = 0
+        self._finished = False
+        weakref.finalize(self, self._chunks.close)
+        thread = threading.Thread(target=_produce,
+                                  args=(self._chunks, iterable, chunk_size))
+        thread.daemon = True
+        thread.start()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        index = self._index
+        if index < len(self._chunk):
+            self._index = index + 1
+            return self._chunk[index]
+        if self._finished:
+            raise StopIteration
+        kind, payload = self._chunks.get()
+        if kind == _ITEMS:
+            self._chunk = payload
+            self._index = 1
+            return payload[0]
+        self._finished = True
+        self._chunk = ()
+        if kind == _ERROR:
+            raise payload
+        raise StopIteration
+
+    def _anext(self):
+        try:
+            return next(self)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        import asyncio
+        loop = asyncio.get_event_loop()
+        if self._index < len(self._chunk):
+            future = loop.create_future()
+            future.set_result(next(self))
+            return future
+        future = loop.run_in_executor(None, self._anext)
+        future.add_done_callback(
+            lambda future: future.cancelled() and self.close())
+        return future
+
+    def close(self):
+        self._chunks.close()
+        self._chunk = ()
+        self._finished = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncPrefetcher(object):
+    """
+    Asynchronous iterator fetching items of async iterable ahead of the
+    consumer, keeping up to depth of them buffered.
+
+    The next item is requested from the iterable as a task as soon as
+    there's room in the buffer, so it's produced while the consumer
+    processes previous ones. Exceptions are re-raised by the consumer in
+    order. close() cancels the pending request and closes the iterable, if
+    it has aclose(). Must be used from a running event loop.
+
+    """
+
+    def __init__(self, aiterable, depth=16):
+        if depth < 1:
+            raise ValueError('depth must be positive')
+        self._iterator = aiterable.__aiter__()
+        self._depth = depth
+        self._buffer = collections.deque()
+        self._pending = None
+        self._waiter = None
+        self._finished = False
+        self._error = None
+        self._fill()
+
+    def _fill(self):
+        if (self._pending is None and not self._finished and
+                len(self._buffer) < self._depth):
+            import asyncio
+            self._pending = asyncio.ensure_future(self._iterator.__anext__())
+            self._pending.add_done_callback(self._fetched)
+
+    def _fetched(self, task):
+        self._pending = None
+        if self._finished:
+            return
+        if task.cancelled():
+            self._finished = True
+        else:
+            error = task.exception()
+            if error is None:
+                self._buffer.append(task.result())
+            else:
+                self._finished = True
+                if not isinstance(error, StopAsyncIteration):
+                    self._error = error
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            self._waiter = None
+            self._resolve(waiter)
+        self._fill()
+
+    def _resolve(self, future):
+        if self._buffer:
+            future.set_result(self._buffer.popleft())
+            self._fill()
+        elif self._error is not None:
+            error, self._error = self._error, None
+            future.set_exception(error)
+        else:
+            future.set_exception(StopAsyncIteration())
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        import asyncio
+        future = asyncio.get_event_loop().create_future()
+        if self._buffer or self._finished:
+            self._resolve(future)
+        else:
+            self._waiter = future
+            self._fill()
+        return future
+
+    def close(self):
+        if self._finished and self._pending is None:
+            self._buffer.clear()
+            return
+        self._finished = True
+        self._buffer.clear()
+        self._error = None
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(StopAsyncIteration())
+        import asyncio
+        aclose = getattr(self._iterator, 'aclose', None)
+        pending = self._pending
+        if pending is not None:
+            pending.cancel()
+            if aclose is not None:
+                pending.add_done_callback(
+                    lambda _: asyncio.ensure_future(aclose()))
+        elif aclose is not None:
+            asyncio.ensure_future(aclose())
+
+
+class PrefetchProxy(ObjectProxy):
+    """
+    Proxy iterating its target in a background thread.
+
+    iter() of the proxy returns a new Prefetcher of the target, unless the
+    target is an iterator (like a file or a cursor): iter() and next() of
+    the proxy of an iterator share a single Prefetcher created on first
+    use, so that items fetched ahead aren't lost when a loop over the proxy
+    breaks and iteration is resumed. __close__() stops it.
+
+    """
+
+    __slots__ = ('__depth__', '__chunk_size__', '__prefetcher__')
+
+    __getattribute__, __setattr__, __delattr__ = _proxy_own_attrs(
+        '__depth__', '__chunk_size__', '__prefetcher__', '__close__')
+
+    def __init__(self, target=_unspecified, depth=16, chunk_size=1):
+        super(PrefetchProxy, self).__init__(target)
+        self.__depth__ = depth
+        self.__chunk_size__ = chunk_size
+        self.__prefetcher__ = None
+
+    def __iter__(self):
+        target = self.__target__
+        iterator = iter(target)
+        if iterator is not target:
+            return Prefetcher(iterator, self.__depth__, self.__chunk_size__)
+        prefetcher = self.__prefetcher__
+        if prefetcher is None:
+            prefetcher = self.__prefetcher__ = Prefetcher(
+                iterator, self.__depth__, self.__chunk_size__)
+        return prefetcher
+
+    def __aiter__(self):
+        return iter(self)
+
+    def __next__(self):
+        prefetcher = self.__prefetcher__
+        if prefetcher is None:
+            prefetcher = self.__prefetcher__ = Prefetcher(
+                self.__target__, self.__depth__, self.__chunk_size__)
+        return next(prefetcher)
+
+    def __close__(self):
+        prefetcher = self.__prefetcher__
+        if prefetcher is not None:
+            prefetcher.close()
+
+
+class AsyncPrefetchProxy(ObjectProxy):
+    """
+    Proxy of an async iterable, fetching its items ahead of the consumer.
+
+    aiter() of the proxy returns a new AsyncPrefetcher of the target,
+    unless the target is an async iterator: aiter() and anext() of the
+    proxy of an async iterator share a single AsyncPrefetcher created on
+    first use, like in PrefetchProxy. __close__() stops it.
+
+    """
+
+    __slots__ = ('__depth__', '__prefetcher__')
+
+    __getattribute__, __setattr__, __delattr__ = _proxy_own_attrs(
+        '__depth__', '__prefetcher__', '__close__')
+
+    def __init__(self, target=_unspecified, depth=16):
+        super(AsyncPrefetchProxy, self).__init__(target)
+        self.__depth__ = depth
+        self.__prefetcher__ = None
+
+    def __aiter__(self):
+        target = self.__target__
+        iterator = target.__aiter__()
+        if iterator is not target:
+            return AsyncPrefetcher(iterator, self.__depth__)
+        prefetcher = self.__prefetcher__
+        if prefetcher is None:
+            prefetcher = self.__prefetcher__ = AsyncPrefetcher(
+                iterator, self.__depth__)
+        return prefetcher
+
+    def __anext__(self):
+        prefetcher = self.__prefetcher__
+        if prefetcher is None:
+            prefetcher = self.__prefetcher__ = AsyncPrefetcher(
+                self.__target__, self.__depth__)
+        return prefetcher.__anext__()
+
+    def __close__(self):
+        prefetcher = self.__prefetcher__
+        if prefetcher is not None:
+            prefetcher.close()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import collections
+import os
+import sys
+import threading
+import time
+
+from .objectproxy import ObjectProxy
+
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+_get_target = ObjectProxy.__target__.__get__
+
+
+def _is_proxy_frame(frame):
+    """
+    Tell if frame runs pyoxy code, including methods generated from
+    templates.
+
+    """
+    code = frame.f_code
+    if code.co_filename.startswith('<pyoxy'):
+        return True
+    name = frame.f_globals.get('__name__') or ''
+    return name.startswith('pyoxy.') and name != __name__
+
+
+def _target_type(frame):
+    """
+    Return name of type of target of the proxy running frame, or None.
+
+    """
+    proxy = frame.f_locals.get('self')
+    if not isinstance(proxy, ObjectProxy):
+        return None
+    try:
+        return type(_get_target(proxy)).__name__
+    except AttributeError:
+        return None
+
+
+def _label(frame, target_type):
+    code = frame.f_code
+    if target_type is not None:
+        return '%s.%s [%s]' % (type(frame.f_locals['self']).__name__,
+                               code.co_name, target_type)
+    return '%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename),
+                           code.co_firstlineno)
+
+
+class ProxyProfiler(object):
+    """
+    Sampling profiler attributing time spent in proxies to proxy methods,
+    their target types and their call sites.
+
+    While running, a background thread samples stacks of all other threads
+    every interval seconds. Samples with proxy frames on the stack are
+    kept: proxy frames are labeled with the proxy class, method and target
+    type (e.g. 'ObjectProxy.__add__ [int]'), other frames with function,
+    file and line. Use as a context manager, with start() and stop(), or
+    toggled by a signal with signal_toggle().
+
+    Results are available as folded stacks, the input format of flame
+    graph tools like flamegraph.pl or speedscope (write_folded()), or
+    summed by target type (by_target_type()) and by the call site
+    entering proxy code (by_call_site()). Sums are of self time, spent in
+    proxy code itself (the innermost frame being a proxy frame), or with
+    total=True of total time, including time spent in targets. Samples
+    are weighted by the time measured since the previous one, as the
+    sampling thread may wake up less often than every interval.
+
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.samples = 0
+        self.stacks = collections.Counter()
+        # Seconds by target type and call site: (self, total) Counters.
+        self._target_types = (collections.Counter(), collections.Counter())
+        self._call_sites = (collections.Counter(), collections.Counter())
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _run(self):
+        ident = threading.current_thread().ident
+        last = _clock()
+        while not self._stop.wait(self.interval):
+            now = _clock()
+            elapsed, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != ident:
+                    self._sample(frame, elapsed)
+
+    def _sample(self, frame, elapsed):
+        labels = []
+        target_type = call_site = None
+        caller_of_proxy = False
+        in_proxy = _is_proxy_frame(frame)
+        while frame is not None:
+            if _is_proxy_frame(frame):
+                frame_type = _target_type(frame)
+                if frame_type is not None and target_type is None:
+                    target_type = frame_type  # of the innermost proxy
+                labels.append(_label(frame, frame_type))
+                caller_of_proxy = True
+            else:
+                label = _label(frame, None)
+                if caller_of_proxy:
+                    call_site = '%s (%s:%d)' % (
+                        frame.f_code.co_name,
+                        os.path.basename(frame.f_code.co_filename),
+                        frame.f_lineno)
+                    label = call_site
+                caller_of_proxy = False
+                labels.append(label)
+            frame = frame.f_back
+        with self._lock:
+            self.samples += 1
+            if call_site is None:
+                return
+            self.stacks[';'.join(reversed(labels))] += 1
+            for counters, key in ((self._target_types, target_type),
+                                  (self._call_sites, call_site)):
+                if in_proxy:
+                    counters[0][key] += elapsed
+                counters[1][key] += elapsed
+
+    def by_target_type(self, total=False):
+        """
+        Return Counter of seconds of self time (or total time) spent in
+        proxies by target type name.
+
+        """
+        with self._lock:
+            return collections.Counter(self._target_types[bool(total)])
+
+    def by_call_site(self, total=False):
+        """
+        Return Counter of seconds of self time (or total time) spent in
+        proxies by call site (the outermost code entering proxy code).
+
+        """
+        with self._lock:
+            return collections.Counter(self._call_sites[bool(total)])
+
+    def write_folded(self, file):
+        """
+        Write sampled stacks to file (a path or a text file object) in
+        folded format: one 'frame;frame;... count' line per stack.
+
+        """
+        if not hasattr(file, 'write'):
+            with open(file, 'w') as f:
+                return self.write_folded(f)
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+        for stack, count in stacks:
+            file.write('%s %d\n' % (stack, count))
+
+
+def signal_toggle(path, signum=None, interval=0.001):
+    """
+    Install handler of signum (SIGUSR2 by default) starting a
+    ProxyProfiler on first signal and, on the next one, stopping it and
+    writing its folded stacks to path; and so on. Return the profiler.
+
+    Must be called from the main thread.
+
+    """
+    import signal
+    profiler = ProxyProfiler(interval)
+    if signum is None:
+        signum = signal.SIGUSR2
+
+    def toggle(signum, frame):
+        if profiler.running:
+            profiler.stop()
+            profiler.write_folded(path)
+        else:
+            profiler.start()
+
+    signal.signal(signum, toggle)
+    return profiler
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import threading
+import weakref
+
+from .objectproxy import ObjectProxy, _unspecified
+
+
+# Dependency on the whole target, rather than on one attribute or item.
+_WHOLE = ('whole',)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def _computing():
+    """
+    Return ComputedProxy being computed in this thread, if any.
+
+    """
+    stack = getattr(_local, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def _depend(proxy, key):
+    """
+    Record that ComputedProxy being computed (if any) read key of proxy.
+
+    """
+    computed = _computing()
+    if computed is None or computed is proxy:
+        return
+    with _lock:
+        dependents = object.__getattribute__(proxy, '__dependents__')
+        # Proxies hash like their targets, so they're kept by id.
+        computeds = dependents.get(key)
+        if computeds is None:
+            computeds = dependents[key] = {}
+        computeds[id(computed)] = weakref.ref(computed)
+        object.__getattribute__(computed, '__sources__').append((proxy, key))
+
+
+def _invalidate(proxy, keys=None):
+    """
+    Invalidate ComputedProxy instances depending on keys of proxy (or on
+    any of its keys, if keys is None).
+
+    """
+    with _lock:
+        dependents = object.__getattribute__(proxy, '__dependents__')
+        if keys is None:
+            keys = list(dependents)
+        refs = []
+        for key in keys:
+            refs.extend(dependents.pop(key, {}).values())
+    for ref in refs:
+        computed = ref()
+        if computed is not None:
+            object.__getattribute__(computed, '__invalidate__')()
+
+
+def _item_key(key):
+    try:
+        hash(key)
+    except TypeError:
+        return _WHOLE
+    return ('item', key)
+
+
+_SOURCE_ATTRS = frozenset(('__dependents__', '__changed__'))
+
+
+class SourceProxy(ObjectProxy):
+    """
+    Mutable input of ComputedProxy instances.
+
+    Reads made while a ComputedProxy is computed are recorded as its
+    dependencies: attribute and item reads (including failed ones) on the
+    attribute or item, anything else (methods, operators, iteration) on
+    the whole target.
+    Writes through the proxy invalidate computations depending on what
+    changed. Changes made behind the proxy's back (e.g. by calling
+    target's methods) must be announced with __changed__().
+
+    """
+
+    __slots__ = ('__dependents__',)
+
+    def __init__(self, target=_unspecified):
+        self.__dependents__ = {}
+        super(SourceProxy, self).__init__(target)
+
+    def __getattribute__(self, attr):
+        if attr in _SOURCE_ATTRS:
+            return object.__getattribute__(self, attr)
+        target = object.__getattribute__(self, '__target__')
+        if attr == '__target__':
+            _depend(self, _WHOLE)
+            return target
+        # Recorded before reading, so that a missing attribute is tracked.
+        _depend(self, ('attr', attr))
+        value = getattr(target, attr)
+        if callable(value):
+            _depend(self, _WHOLE)
+        return value
+
+    def __setattr__(self, attr, value):
+        if attr in _SOURCE_ATTRS:
+            object.__setattr__(self, attr, value)
+        elif attr == '__target__':
+            object.__setattr__(self, attr, value)
+            _invalidate(self)
+        else:
+            setattr(object.__getattribute__(self, '__target__'), attr, value)
+            self.__changed__(('attr', attr))
+
+    def __delattr__(self, attr):
+        if attr in _SOURCE_ATTRS:
+            object.__delattr__(self, attr)
+        elif attr == '__target__':
+            object.__delattr__(self, attr)
+            _invalidate(self)
+        else:
+            delattr(object.__getattribute__(self, '__target__'), attr)
+            self.__changed__(('attr', attr))
+
+    def __changed__(self, key=None):
+        """
+        Invalidate computations depending on key, an ('attr', name) or
+        ('item', key) pair, or on anything if key is None.
+
+        """
+        _invalidate(self, None if key is None else (key, _WHOLE))
+
+    def __getitem__(self, key):
+        _depend(self, _item_key(key))
+        return object.__getattribute__(self, '__target__')[key]
+
+    def __setitem__(self, key, value):
+        object.__getattribute__(self, '__target__')[key] = value
+        self.__changed__(_item_key(key))
+
+    def __delitem__(self, key):
+        del object.__getattribute__(self, '__target__')[key]
+        self.__changed__(_item_key(key))
+
+    def __contains__(self, item):
+        _depend(self, _item_key(item))
+        return item in object.__getattribute__(self, '__target__')
+
+
+_COMPUTED_ATTRS = frozenset((
+    '__compute__', '__version__', '__computed_version__', '__sources__',
+    '__dependents__', '__lock__', '__value__', '__invalidate__',
+))
+
+
+class ComputedProxy(ObjectProxy):
+    """
+    Proxy of a value derived by compute() from SourceProxy and other
+    ComputedProxy instances.
+
+    The value is computed on first access and cached. Sources read by
+    compute() are tracked, and the cached value is reused until one of
+    them changes; then it's recomputed on next access.
+
+    """
+
+    __slots__ = ('__compute__', '__version__', '__computed_version__',
+                 '__sources__', '__dependents__', '__lock__')
+
+    def __init__(self, compute):
+        self.__compute__ = compute
+        self.__version__ = 1
+        self.__computed_version__ = 0
+        self.__sources__ = []
+        self.__dependents__ = {}
+        self.__lock__ = threading.RLock()
+
+    def __getattribute__(self, attr):
+        if attr in _COMPUTED_ATTRS:
+            return object.__getattribute__(self, attr)
+        target = object.__getattribute__(self, '__value__')()
+        return target if attr == '__target__' else getattr(target, attr)
+
+    def __setattr__(self, attr, value):
+        if attr in _COMPUTED_ATTRS:
+            object.__setattr__(self, attr, value)
+        else:
+            raise AttributeError('computed values are read-only')
+
+    def __delattr__(self, attr):
+        raise AttributeError('computed values are read-only')
+
+    def __value__(self):
+        """
+        Return the value, recomputing it if any of its sources changed.
+
+        """
+        if self.__computed_version__ != self.__version__:
+            with self.__lock__:
+                while self.__computed_version__ != self.__version__:
+                    version = self.__version__
+                    with _lock:
+                        for source, key in self.__sources__:
+                            computeds = object.__getattribute__(
+                                source, '__dependents__').get(key)
+                            if computeds is not None:
+                                computeds.pop(id(self), None)
+                        del self.__sources__[:]
+                    stack = getattr(_local, 'stack', None)
+                    if stack is None:
+                        stack = _local.stack = []
+                    stack.append(self)
+                    try:
+                        value = self.__compute__()
+                    finally:
+                        stack.pop()
+                    object.__setattr__(self, '__target__', value)
+                    self.__computed_version__ = version
+        _depend(self, _WHOLE)
+        return object.__getattribute__(self, '__target__')
+
+    def __invalidate__(self):
+        self.__version__ += 1
+        _invalidate(self)
+
+    def __setitem__(self, key, value):
+        raise TypeError('computed values are read-only')
+
+    def __delitem__(self, key):
+        raise TypeError('computed values are read-only')
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import mmap
+import pickle
+import re
+import struct
+import threading
+
+from .objectproxy import ObjectProxy, _compile_template
+
+
+_HEADER = struct.Struct('<II')
+# Keys are compared as pickled bytes, so pin the protocol.
+_KEY_PROTOCOL = 2
+
+_VALUE = 0
+_ERROR = 1
+_OBJECT = 2
+
+_VALUE_TYPES = (type(None), bool, int, float, complex, bytes, type(''), type)
+_CONTAINER_TYPES = (tuple, list, set, frozenset)
+
+try:  # pragma: no cover
+    _VALUE_TYPES += (long,)
+except NameError:  # pragma: no cover
+    pass
+
+
+def _is_value(obj):
+    """
+    Tell if obj is recorded as a value, rather than proxied in turn.
+
+    """
+    if isinstance(obj, _VALUE_TYPES):
+        return True
+    if isinstance(obj, _CONTAINER_TYPES):
+        return all(_is_value(item) for item in obj)
+    if isinstance(obj, dict):
+        return all(_is_value(key) and _is_value(value)
+                   for key, value in obj.items())
+    return False
+
+
+# Default reprs, with object addresses which differ from run to run.
+_ADDRESS = re.compile(r' at 0x[0-9a-fA-F]+')
+
+
+class _Unordered(tuple):
+    """
+    Sets and dicts in keys: their type and sorted items.
+
+    """
+
+    __slots__ = ()
+
+
+def _sort_key(item):
+    try:
+        return pickle.dumps(item, _KEY_PROTOCOL)
+    except Exception:
+        return repr(item).encode('utf-8')
+
+
+def _normalize(obj):
+    """
+    Return obj with sets and dicts replaced by _Unordered, so that equal
+    arguments give equal keys whatever their iteration order (which for
+    sets depends on PYTHONHASHSEED).
+
+    """
+    if type(obj) in (tuple, list):
+        return type(obj)(_normalize(item) for item in obj)
+    if isinstance(obj, (set, frozenset)):
+        items = (_normalize(item) for item in obj)
+    elif isinstance(obj, dict):
+        items = ((_normalize(key), _normalize(value))
+                 for key, value in obj.items())
+    else:
+        return obj
+    return _Unordered((type(obj), tuple(sorted(items, key=_sort_key))))
+
+
+def _keyable(args):
+    """
+    Return normalized args if they can be pickled, their repr otherwise.
+
+    Raise TypeError if the repr includes an object address, as such keys
+    wouldn't match when replayed.
+
+    """
+    args = _normalize(args)
+    try:
+        pickle.dumps(args, _KEY_PROTOCOL)
+    except Exception:
+        text = repr(args)
+        if _ADDRESS.search(text):
+            raise TypeError('arguments can\'t be recorded reproducibly: %s'
+                            % text)
+        return text
+    return args
+
+
+class ReplayMiss(LookupError):
+    """
+    Raised when replayed interaction wasn't recorded.
+
+    """
+
+
+class Recorder(object):
+    """
+    Writer of the interaction log, shared by a RecordingProxy and proxies
+    of objects it returns.
+
+    The log is a stream of frames: a header with lengths of the key and of
+    the outcome, the pickled key (path of the object, operation and its
+    arguments) and the pickled outcome (a value, an exception or a marker
+    of an object which got proxied in turn).
+
+    """
+
+    def __init__(self, file):
+        if hasattr(file, 'write'):
+            self.file = file
+            self._close = False
+        else:
+            self.file = open(file, 'wb')
+            self._close = True
+        self._lock = threading.Lock()
+
+    def write(self, key, kind, payload=None):
+        try:
+            outcome = pickle.dumps((kind, payload), pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            if kind != _ERROR:
+                raise
+            outcome = pickle.dumps((kind, RuntimeError(repr(payload))),
+                                   pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.file.write(_HEADER.pack(len(key), len(outcome)))
+            self.file.write(key)
+            self.file.write(outcome)
+
+    def close(self):
+        with self._lock:
+            if self._close:
+                self.file.close()
+            else:
+                self.file.flush()
+
+
+class Replay(object):
+    """
+    Reader of an interaction log.
+
+    The log is memory-mapped and indexed by scanning only frame headers and
+    keys on first use; outcomes are unpickled on demand. Outcomes of each
+    key are served in the recorded order; when they run out, the last one
+    is repeated.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+        self._index = None
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                data = b''
+        index = {}
+        offset = 0
+        header_size = _HEADER.size
+        while offset < len(data):
+            key_len, outcome_len = _HEADER.unpack_from(data, offset)
+            offset += header_size
+            key = data[offset:offset + key_len]
+            offset += key_len
+            index.setdefault(key, []).append((offset, outcome_len))
+            offset += outcome_len
+        self._data = data
+        self._index = index
+
+    def outcome(self, key):
+        """
+        Return next (kind, payload) outcome of key.
+
+        """
+        with self._lock:
+            if self._index is None:
+                self._load()
+            try:
+                outcomes = self._index[key]
+            except KeyError:
+                raise ReplayMiss(pickle.loads(key))
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            offset, length = outcomes[min(cursor, len(outcomes) - 1)]
+            outcome = self._data[offset:offset + length]
+        return pickle.loads(outcome)
+
+    def close(self):
+        with self._lock:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._data = self._index = None
+            self._cursors.clear()
+
+
+RECORDED_OPS = (
+    ('__getitem__', ', key', '(key,)', 'target[key]'),
+    ('__setitem__', ', key, value', '(key, value)',
+     'target.__setitem__(key, value)'),
+    ('__delitem__', ', key', '(key,)', 'target.__delitem__(key)'),
+    ('__contains__', ', item', '(item,)', 'item in target'),
+    ('__len__', '', '()', 'len(target)'),
+    ('__iter__', '', '()', 'iter(target)'),
+    ('__next__', '', '()', 'next(target)'),
+    ('__bool__', '', '()', 'bool(target)'),
+    ('__hash__', '', '()', 'hash(target)'),
+    ('__repr__', '', '()', 'repr(target)'),
+    ('__str__', '', '()', 'str(target)'),
+    ('__call__', ', *args, **kwargs', '(args, tuple(sorted(kwargs.items())))',
+     'target(*args, **kwargs)'),
+) + tuple(
+    ('__%s__' % method, ', other', '(other,)', 'target %s other' % op)
+    for method, op in (
+        ('lt', '<'), ('le', '<='), ('eq', '=='), ('ne', '!='),
+        ('gt', '>'), ('ge', '>='),
+        ('add', '+'), ('sub', '-'), ('mul', '*'), ('truediv', '/'),
+        ('floordiv', '//'), ('mod', '%'), ('lshift', '<<'), ('rshift', '>>'),
+        ('and', '&'), ('xor', '^'), ('or', '|'),
+    )
+) + tuple(
+    ('__r%s__' % method, ', other', '(other,)', 'other %s target' % op)
+    for method, op in (
+        ('add', '+'), ('sub', '-'), ('mul', '*'), ('truediv', '/'),
+        ('floordiv', '//'), ('mod', '%'),
+    )
+) + tuple(
+    ('__%s__' % method, '', '()', '%starget' % op)
+    for method, op in (('neg', '-'), ('pos', '+'), ('invert', '~'))
+)
+
+RECORD_METHOD_TEMPLATE = """
+def {method}(self{params}):
+    return self.__record__({method!r}, {args}, lambda target: {expr})
+"""
+REPLAY_METHOD_TEMPLATE = """
+def {method}(self{params}):
+    return self.__replay__({method!r}, {args})
+"""
+
+
+def _methods(template, cls_name):
+    namespace = {}
+    for method, params, args, expr in RECORDED_OPS:
+        exec(_compile_template(
+            template.format(method=str(method), params=params, args=args,
+                            expr=expr),
+            'recording.%s.%s' % (cls_name, method)), namespace)
+    namespace.pop('__builtins__', None)
+    return namespace
+
+
+_RECORDING_ATTRS = frozenset(('__recorder__', '__record_path__', '__record__'))
+
+
+class RecordingProxy(ObjectProxy):
+    """
+    Proxy logging interactions with its target to a Recorder.
+
+    Attribute reads and writes, calls, item access, iteration and
+    operators listed in RECORDED_OPS are recorded with their arguments and
+    outcomes. Values (None, numbers, strings, bytes, classes and
+    containers of those) and exceptions are recorded as they are; other
+    objects are returned wrapped in a RecordingProxy recording their
+    interactions in turn.
+
+    """
+
+    __slots__ = ('__recorder__', '__record_path__')
+
+    def __init__(self, target, recorder, path=()):
+        super(RecordingProxy, self).__init__(target)
+        self.__recorder__ = recorder
+        self.__record_path__ = path
+
+    def __getattribute__(self, attr):
+        if attr in _RECORDING_ATTRS:
+            return object.__getattribute__(self, attr)
+        target = object.__getattribute__(self, '__target__')
+        if attr == '__target__':
+            return target
+        return object.__getattribute__(self, '__record__')(
+            '__getattr__', (attr,), lambda target: getattr(target, attr))
+
+    def __setattr__(self, attr, value):
+        if attr in _RECORDING_ATTRS or attr == '__target__':
+            object.__setattr__(self, attr, value)
+        else:
+            self.__record__('__setattr__', (attr, value),
+                            lambda target: setattr(target, attr, value))
+
+    def __delattr__(self, attr):
+        if attr in _RECORDING_ATTRS or attr == '__target__':
+            object.__delattr__(self, attr)
+        else:
+            self.__record__('__delattr__', (attr,),
+                            lambda target: delattr(target, attr))
+
+    def __record__(self, op, args, fn):
+        recorder = self.__recorder__
+        args = _keyable(args)
+        path = self.__record_path__
+        key = pickle.dumps((path, op, args), _KEY_PROTOCOL)
+        try:
+            result = fn(object.__getattribute__(self, '__target__'))
+        except Exception as e:
+            recorder.write(key, _ERROR, e)
+            raise
+        if _is_value(result):
+            try:
+                recorder.write(key, _VALUE, result)
+            except Exception:  # e.g. a class which can't be pickled
+                pass
+            else:
+                return result
+        recorder.write(key, _OBJECT)
+        return RecordingProxy(result, recorder, path + ((op, args),))
+
+for _name, _method in _methods(RECORD_METHOD_TEMPLATE,
+                               'RecordingProxy').items():
+    setattr(RecordingProxy, _name, _method)
+
+
+_REPLAY_ATTRS = frozenset(('__replay_log__', '__record_path__', '__replay__'))
+
+
+class ReplayProxy(ObjectProxy):
+    """
+    Proxy serving interactions recorded by a RecordingProxy from a Replay,
+    without the target.
+
+    Interactions which weren't recorded raise ReplayMiss.
+
+    """
+
+    __slots__ = ('__replay_log__', '__record_path__')
+
+    def __init__(self, replay, path=()):
+        self.__replay_log__ = replay
+        self.__record_path__ = path
+
+    def __getattribute__(self, attr):
+        if attr in _REPLAY_ATTRS:
+            return object.__getattribute__(self, attr)
+        return object.__getattribute__(self, '__replay__')(
+            '__getattr__', (attr,))
+
+    def __setattr__(self, attr, value):
+        if attr in _REPLAY_ATTRS:
+            object.__setattr__(self, attr, value)
+        else:
+            self.__replay__('__setattr__', (attr, value))
+
+    def __delattr__(self, attr):
+        self.__replay__('__delattr__', (attr,))
+
+    def __replay__(self, op, args):
+        args = _keyable(args)
+        path = self.__record_path__
+        kind, payload = self.__replay_log__.outcome(
+            pickle.dumps((path, op, args), _KEY_PROTOCOL))
+        if kind == _ERROR:
+            raise payload
+        if kind == _OBJECT:
+            return ReplayProxy(self.__replay_log__, path + ((op, args),))
+        return payload
+
+for _name, _method in _methods(REPLAY_METHOD_TEMPLATE,
+                               'ReplayProxy').items():
+    setattr(ReplayProxy, _name, _method)
+del _name, _method
+
+
+def record(target, file):
+    """
+    Return RecordingProxy of target logging to file (a path or a binary
+    file object). Call __recorder__.close() when done.
+
+    """
+    return RecordingProxy(target, Recorder(file))
+
+
+def replay(path):
+    """
+    Return ReplayProxy serving interactions logged to path.
+
+    """
+    return ReplayProxy(Replay(path))
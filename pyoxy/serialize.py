@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import itertools
+import json
+
+from .objectproxy import ObjectProxy
+
+try:  # pragma: no cover
+    from collections.abc import Iterator, Mapping
+except ImportError:  # pragma: no cover
+    from collections import Iterator, Mapping
+
+try:  # pragma: no cover
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def unwrap(obj):
+    """
+    Return innermost target of a chain of proxies (or obj, if it isn't a
+    proxy).
+
+    """
+    while isinstance(obj, ObjectProxy):
+        obj = obj.__target__
+    return obj
+
+
+def _plain(obj):
+    """
+    Return copy of obj with proxies replaced by their targets, for pure
+    Python encoders (whose type checks they pass, but whose int.__repr__ or
+    float.__repr__ calls they don't).
+
+    """
+    obj = unwrap(obj)
+    if isinstance(obj, Mapping):
+        return dict((unwrap(key), _plain(value)) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, Iterator)):
+        return [_plain(item) for item in obj]
+    return obj
+
+
+def _default(default):
+    """
+    Return encoder's default hook unwrapping proxies and passing other
+    objects to default.
+
+    """
+    def unwrap_default(obj):
+        if isinstance(obj, ObjectProxy):
+            return unwrap(obj)
+        if default is None:
+            raise TypeError('Object of type %s is not serializable' %
+                            type(obj).__name__)
+        return default(obj)
+    return unwrap_default
+
+
+class JSONEncoder(json.JSONEncoder):
+    """
+    JSON encoder serializing proxies as their targets.
+
+    Proxies are passed to default(), which C accelerated encoding calls
+    only for objects it doesn't know, so plain parts of a proxied graph
+    are encoded at full speed. Dict keys must not be proxies, except keys
+    of the top-level dict encoded by iter_json() and dump_json().
+
+    """
+
+    def default(self, obj):
+        if isinstance(obj, ObjectProxy):
+            return unwrap(obj)
+        return super(JSONEncoder, self).default(obj)
+
+
+def _chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _is_sequence(obj):
+    return isinstance(obj, (list, tuple, Iterator))
+
+
+def iter_json(obj, chunk_size=1000, **kwargs):
+    """
+    Encode obj (which may be or contain proxies) as JSON, yielding the
+    output in pieces.
+
+    Top-level lists, tuples, dicts and iterators (like generators, or
+    iter() of a PrefetchProxy) are encoded chunk_size items at a time, so
+    they're never held in memory as a whole, neither encoded nor (for
+    iterators) decoded. Keyword arguments are those of json.dumps();
+    with indent, which the C accelerated encoder doesn't support, obj is
+    copied without proxies and encoded in one piece.
+
+    """
+    encoder = JSONEncoder(**kwargs)
+    obj = unwrap(obj)
+    if encoder.indent is not None:
+        yield encoder.encode(_plain(obj))
+        return
+    if not (isinstance(obj, Mapping) or _is_sequence(obj)):
+        yield encoder.encode(obj)
+        return
+
+    separator = encoder.item_separator
+    if isinstance(obj, Mapping):
+        items = ((unwrap(key), value) for key, value in obj.items())
+        if encoder.sort_keys:
+            items = sorted(items)
+        chunks = (dict(chunk) for chunk in _chunks(items, chunk_size))
+        start, end = '{', '}'
+    else:
+        chunks = _chunks(obj, chunk_size)
+        start, end = '[', ']'
+    yield start
+    first = True
+    for chunk in chunks:
+        if not first:
+            yield separator
+        first = False
+        yield encoder.encode(chunk)[1:-1]
+    yield end
+
+
+def dump_json(obj, fp, chunk_size=1000, **kwargs):
+    """
+    Encode obj as JSON (see iter_json()) writing the output to fp (a text
+    file, or a socket's makefile('w')) as it's produced.
+
+    """
+    write = fp.write
+    for piece in iter_json(obj, chunk_size, **kwargs):
+        write(piece)
+
+
+def iter_msgpack(obj, chunk_size=1000, default=None, **kwargs):
+    """
+    Encode obj (which may be or contain proxies) with msgpack, yielding the
+    output in pieces.
+
+    Top-level lists, tuples and dicts are encoded chunk_size items at a
+    time; iterators are collected first, as msgpack arrays start with their
+    length. Keyword arguments are those of msgpack.Packer.
+
+    """
+    packer = msgpack.Packer(default=_default(default), **kwargs)
+    obj = unwrap(obj)
+    if isinstance(obj, Iterator):
+        obj = list(obj)
+    if isinstance(obj, Mapping):
+        yield packer.pack_map_header(len(obj))
+        for chunk in _chunks(obj.items(), chunk_size):
+            yield b''.join(packer.pack(unwrap(key)) + packer.pack(value)
+                           for key, value in chunk)
+    elif isinstance(obj, (list, tuple)):
+        yield packer.pack_array_header(len(obj))
+        for chunk in _chunks(obj, chunk_size):
+            yield b''.join(packer.pack(item) for item in chunk)
+    else:
+        yield packer.pack(obj)
+
+
+def dump_msgpack(obj, fp, chunk_size=1000, **kwargs):
+    """
+    Encode obj with msgpack (see iter_msgpack()) writing the output to fp
+    (a binary file, or a socket's makefile('wb')) as it's produced.
+
+    """
+    write = fp.write
+    for piece in iter_msgpack(obj, chunk_size, **kwargs):
+        write(piece)
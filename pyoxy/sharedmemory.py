@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import os
+import struct
+import threading
+import weakref
+
+from .objectproxy import ObjectProxy
+
+
+class StructArray(object):
+    """
+    Sequence of struct-packed records stored in a buffer.
+
+    Items are tuples unpacked with struct format; assigning a tuple packs
+    it in place.
+
+    """
+
+    __slots__ = ('_buf', '_struct')
+
+    def __init__(self, buf, format):
+        self._buf = buf
+        self._struct = struct.Struct(format)
+
+    def __len__(self):
+        return len(self._buf) // self._struct.size
+
+    def _offset(self, index):
+        length = len(self)
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError('record index out of range')
+        return index * self._struct.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self._struct.unpack_from(self._buf, self._offset(index))
+
+    def __setitem__(self, index, record):
+        self._struct.pack_into(self._buf, self._offset(index), *record)
+
+    def __iter__(self):
+        size = self._struct.size
+        return self._struct.iter_unpack(self._buf[:len(self) * size])
+
+    def release(self):
+        self._buf.release()
+
+
+def buffer_view(format='B', shape=None):
+    """
+    Return view factory making a memoryview of given item format and shape
+    (like array.array of typecode format, without copying).
+
+    """
+    def view(buf):
+        return buf.cast(format) if shape is None else buf.cast(format, shape)
+    return view
+
+
+def numpy_view(dtype, shape):
+    """
+    Return view factory making a numpy array backed by the shared memory.
+
+    """
+    def view(buf):
+        import numpy
+        return numpy.ndarray(shape, dtype, buffer=buf)
+    return view
+
+
+def struct_view(format):
+    """
+    Return view factory making a StructArray of records of struct format.
+
+    """
+    return lambda buf: StructArray(buf.cast('B'), format)
+
+
+class _Segment(object):
+
+    __slots__ = ('shm', 'refs', 'owner_pid')
+
+    def __init__(self, shm, owner_pid=None):
+        self.shm = shm
+        self.refs = 0
+        self.owner_pid = owner_pid
+
+
+# Shared memory segments attached in this process, by name.
+_segments = {}
+# Released segments which couldn't be closed yet, because some views of
+# them (like numpy arrays) are still alive.
+_lingering = []
+_segments_lock = threading.Lock()
+
+
+def _open(name):
+    from multiprocessing import resource_tracker, shared_memory
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name)
+        # Only the creator should have the segment unlinked at exit.
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _acquire(name):
+    with _segments_lock:
+        segment = _segments.get(name)
+        if segment is None or segment.shm.buf is None:
+            segment = _segments[name] = _Segment(_open(name))
+        segment.refs += 1
+        return segment.shm
+
+
+def _release(name, target):
+    """
+    Release a view of a segment, closing the segment on last release
+    (and unlinking it in the process that created it).
+
+    """
+    release = getattr(target, 'release', None)
+    if release is not None:
+        release()
+    with _segments_lock:
+        segment = _segments.get(name)
+        if segment is None:
+            return
+        segment.refs -= 1
+        if segment.refs:
+            return
+        del _segments[name]
+        _lingering.append(segment.shm)
+        for shm in list(_lingering):
+            try:
+                shm.close()
+            except BufferError:
+                continue
+            _lingering.remove(shm)
+    if segment.owner_pid == os.getpid():
+        segment.shm.unlink()
+
+
+_OWN_ATTRS = frozenset((
+    '__shm_name__', '__view__', '__size__', '__finalizer__', '__lock__',
+    '__attach__', '__detach__',
+))
+
+
+class SharedMemoryProxy(ObjectProxy):
+    """
+    Proxy of an object backed by a named multiprocessing.shared_memory
+    segment.
+
+    The segment is attached on first access and the target is made from
+    its buffer (first size bytes, if given) by view: a memoryview of bytes
+    by default, or a factory from buffer_view(), numpy_view() or
+    struct_view(). Proxies in other processes attach to the same memory by
+    name, without copying.
+
+    Segments are reference counted per process: __detach__() (or garbage
+    collection of the proxy) releases the target and the last release in
+    a process closes the segment there. Segments created with share() are
+    unlinked by the last release in the creating process. Targets must
+    not be used after their proxy is detached.
+
+    """
+
+    __slots__ = ('__shm_name__', '__view__', '__size__', '__finalizer__',
+                 '__lock__')
+
+    def __init__(self, name, view=None, size=None):
+        self.__shm_name__ = name
+        self.__view__ = buffer_view() if view is None else view
+        self.__size__ = size
+        self.__finalizer__ = None
+        self.__lock__ = threading.Lock()
+
+    def __getattribute__(self, attr):
+        if attr in _OWN_ATTRS:
+            return object.__getattribute__(self, attr)
+        try:
+            target = object.__getattribute__(self, '__target__')
+        except AttributeError:
+            target = object.__getattribute__(self, '__attach__')()
+        return target if attr == '__target__' else getattr(target, attr)
+
+    def __setattr__(self, attr, value):
+        if attr in _OWN_ATTRS:
+            object.__setattr__(self, attr, value)
+        else:
+            setattr(self.__target__, attr, value)
+
+    def __delattr__(self, attr):
+        if attr in _OWN_ATTRS:
+            object.__delattr__(self, attr)
+        elif attr == '__target__':
+            self.__detach__()
+        else:
+            delattr(self.__target__, attr)
+
+    def __attach__(self):
+        """
+        Attach the segment (if not attached yet) and return the target.
+
+        """
+        with self.__lock__:
+            try:
+                return object.__getattribute__(self, '__target__')
+            except AttributeError:
+                pass
+            name = self.__shm_name__
+            buf = _acquire(name).buf[:self.__size__]
+            try:
+                target = self.__view__(buf)
+            except BaseException:
+                buf.release()
+                _release(name, None)
+                raise
+            try:
+                buf.release()
+            except BufferError:  # exported to the target, like numpy arrays
+                pass
+            object.__setattr__(self, '__target__', target)
+            self.__finalizer__ = weakref.finalize(self, _release, name, target)
+            return target
+
+    def __detach__(self):
+        """
+        Release the target and this proxy's reference to the segment.
+
+        """
+        with self.__lock__:
+            finalizer = self.__finalizer__
+            if finalizer is None:
+                return
+            self.__finalizer__ = None
+            object.__delattr__(self, '__target__')
+        finalizer()
+
+
+def share(data, view=None, name=None):
+    """
+    Copy buffer data to a new shared memory segment and return its proxy.
+
+    The segment is unlinked when its last proxy in this process is
+    released. Other processes attach to it by the proxy's __shm_name__.
+
+    """
+    from multiprocessing import shared_memory
+    data = memoryview(data).cast('B')
+    shm = shared_memory.SharedMemory(name, create=True, size=max(len(data), 1))
+    shm.buf[:len(data)] = data
+    with _segments_lock:
+        _segments[shm.name] = _Segment(shm, os.getpid())
+    proxy = SharedMemoryProxy(shm.name, view, len(data))
+    proxy.__attach__()
+    return proxy
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import collections
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import weakref
+
+from .objectproxy import ObjectProxy
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _dump_pickle(obj, path):
+    with open(path, 'wb') as f:
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+
+
+def _load_bytes(path):
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return b''  # empty files can't be mapped
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _dump_bytes(obj, path):
+    with open(path, 'wb') as f:
+        f.write(obj)
+
+
+def _load_numpy(path):
+    import numpy
+    return numpy.load(path, mmap_mode='r')
+
+
+def _dump_numpy(obj, path):
+    import numpy
+    with open(path, 'wb') as f:  # numpy.save() would append '.npy'
+        numpy.save(f, obj)
+
+
+LOADERS = {
+    'pickle': _load_pickle,
+    'bytes': _load_bytes,
+    'numpy': _load_numpy,
+}
+DUMPERS = {
+    'pickle': _dump_pickle,
+    'bytes': _dump_bytes,
+    'numpy': _dump_numpy,
+}
+
+
+def _replace(dump, obj, path):
+    """
+    Dump obj to a temporary file and move it over path, so that path is
+    never left partially written.
+
+    """
+    fd, temp_path = tempfile.mkstemp(
+        prefix='.' + os.path.basename(path) + '.',
+        dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        dump(obj, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _sizeof(target, path):
+    """
+    Estimate memory taken by a loaded target.
+
+    Arrays report their nbytes, buffers their length. Unpickled object
+    graphs are assumed to take as much as their pickle file.
+
+    """
+    nbytes = getattr(target, 'nbytes', None)
+    if nbytes is not None:
+        return nbytes
+    if isinstance(target, (bytes, bytearray, mmap.mmap)):
+        return len(target)
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return sys.getsizeof(target)
+
+
+class SpillManager(object):
+    """
+    Track targets of SpillProxy instances against a memory budget.
+
+    When resident targets take more than budget bytes, least recently used
+    ones are evicted. Budget of None means no limit.
+
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.resident = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, proxy, size):
+        """
+        Register loaded target of a proxy and evict others over budget.
+
+        """
+        # Evict without holding the lock, proxies take their own locks.
+        for victim in self._add(proxy, size):
+            victim.__evict__()
+
+    def _add(self, proxy, size):
+        """
+        Register loaded target of a proxy and return proxies to evict.
+
+        """
+        key = id(proxy)
+        ref = weakref.ref(proxy, lambda ref: self._forget(key, ref))
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (ref, size)
+            self.resident += size
+            victims = []
+            if self.budget is not None:
+                for victim_key in list(self._entries):
+                    if self.resident <= self.budget:
+                        break
+                    if victim_key != key:
+                        victim = self._discard(victim_key)
+                        if victim is not None:
+                            victims.append(victim)
+        return victims
+
+    def touch(self, proxy):
+        """
+        Mark target of a proxy as most recently used.
+
+        """
+        with self._lock:
+            try:
+                self._entries.move_to_end(id(proxy))
+            except KeyError:
+                pass
+            except AttributeError:  # pragma: no cover
+                entry = self._entries.pop(id(proxy), None)
+                if entry is not None:
+                    self._entries[id(proxy)] = entry
+
+    def discard(self, proxy):
+        """
+        Stop tracking target of a proxy.
+
+        """
+        with self._lock:
+            self._discard(id(proxy))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.resident -= entry[1]
+        return entry[0]()
+
+    def _forget(self, key, ref):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is ref:
+                self._discard(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+default_manager = SpillManager()
+
+
+_OWN_ATTRS = frozenset((
+    '__spill_path__', '__spill_format__', '__spill_manager__',
+    '__writeback__', '__load_lock__', '__load__', '__evict__',
+))
+
+
+class SpillProxy(ObjectProxy):
+    """
+    Proxy loading its target from a file on first access.
+
+    Format is one of LOADERS keys: 'pickle' (unpickled object), 'bytes'
+    (read-only mmap of the file) or 'numpy' (read-only memory-mapped
+    array, requires numpy). Loaded targets are tracked by a SpillManager
+    (default_manager unless given), which evicts least recently used ones
+    when over its budget; evicted targets are reloaded on next access.
+
+    With writeback=True (pickle format only) evicted targets are pickled
+    back to the file, so changes made through the proxy survive eviction.
+
+    """
+
+    __slots__ = ('__spill_path__', '__spill_format__', '__spill_manager__',
+                 '__writeback__', '__load_lock__')
+
+    def __init__(self, path, format='pickle', manager=None, writeback=False):
+        if format not in LOADERS:
+            raise ValueError('unknown format: %r' % (format,))
+        if writeback and format != 'pickle':
+            raise ValueError('writeback requires pickle format')
+        self.__spill_path__ = path
+        self.__spill_format__ = format
+        self.__spill_manager__ = \
+            default_manager if manager is None else manager
+        self.__writeback__ = writeback
+        self.__load_lock__ = threading.RLock()
+
+    def __getattribute__(self, attr):
+        if attr in _OWN_ATTRS:
+            return object.__getattribute__(self, attr)
+        target = object.__getattribute__(self, '__load__')()
+        return target if attr == '__target__' else getattr(target, attr)
+
+    def __setattr__(self, attr, value):
+        if attr in _OWN_ATTRS:
+            object.__setattr__(self, attr, value)
+        elif attr == '__target__':
+            with self.__load_lock__:
+                object.__setattr__(self, attr, value)
+                victims = self.__spill_manager__._add(
+                    self, _sizeof(value, self.__spill_path__))
+            for victim in victims:
+                victim.__evict__()
+        else:
+            setattr(self.__target__, attr, value)
+
+    def __delattr__(self, attr):
+        if attr in _OWN_ATTRS:
+            object.__delattr__(self, attr)
+        elif attr == '__target__':
+            self.__evict__()
+        else:
+            delattr(self.__target__, attr)
+
+    def __load__(self):
+        """
+        Return the target, loading it if it isn't resident.
+
+        """
+        try:
+            target = object.__getattribute__(self, '__target__')
+        except AttributeError:
+            with self.__load_lock__:
+                try:
+                    return object.__getattribute__(self, '__target__')
+                except AttributeError:
+                    path = self.__spill_path__
+                    target = LOADERS[self.__spill_format__](path)
+                    object.__setattr__(self, '__target__', target)
+                    # Registered under the lock, so that a concurrent
+                    # eviction can't interleave with it.
+                    victims = self.__spill_manager__._add(
+                        self, _sizeof(target, path))
+            for victim in victims:
+                victim.__evict__()
+            return target
+        self.__spill_manager__.touch(self)
+        return target
+
+    def __evict__(self):
+        """
+        Drop the resident target (writing it back if enabled).
+
+        """
+        with self.__load_lock__:
+            try:
+                target = object.__getattribute__(self, '__target__')
+            except AttributeError:
+                return
+            if self.__writeback__:
+                _replace(DUMPERS[self.__spill_format__], target,
+                         self.__spill_path__)
+            object.__delattr__(self, '__target__')
+            self.__spill_manager__.discard(self)
+
+
+def spill(obj, path, format='pickle', manager=None, writeback=False):
+    """
+    Write obj to path and return a SpillProxy loading it back on demand.
+
+    """
+    DUMPERS[format](obj, path)
+    return SpillProxy(path, format, manager, writeback)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import threading
+
+from .objectproxy import (
+    ObjectProxy, _compile_template, _proxy_own_attrs, _unspecified)
+
+
+_get_target = ObjectProxy.__target__.__get__
+_set_target = ObjectProxy.__target__.__set__
+
+LOCKED_I_OP_METHOD_TEMPLATE = """
+def __i{method}__(self, other):
+    with self.__lock__:
+        target = _get_target(self)
+        target {op}= other
+        _set_target(self, target)
+    return self
+"""
+
+
+def _locked_i_op(method, op):
+    return _compile_template(
+        LOCKED_I_OP_METHOD_TEMPLATE.format(method=method, op=op),
+        'threadsafe.__i%s__' % method)
+
+
+class ThreadSafeProxy(ObjectProxy):
+    """
+    Proxy safe to share between threads, including on free-threaded
+    (no-GIL) builds of CPython.
+
+    Reads don't lock: the target is read from its slot with a single
+    atomic load, so concurrent readers scale across cores. Operations
+    writing back to the target, i.e. in-place operators (like += on an
+    immutable target, which replaces it), __update__() and
+    __compare_and_set__(), are serialized by a per-proxy lock, so none
+    of the updates are lost. Assigning __target__ directly doesn't lock;
+    the last assignment wins.
+
+    Thread safety of the target itself (e.g. of appending to a shared
+    list) is up to the target.
+
+    """
+
+    __slots__ = ('__lock__',)
+
+    __getattribute__, __setattr__, __delattr__ = _proxy_own_attrs(
+        '__lock__', '__update__', '__compare_and_set__')
+
+    def __init__(self, target=_unspecified):
+        super(ThreadSafeProxy, self).__init__(target)
+        self.__lock__ = threading.Lock()
+
+    def __update__(self, fn):
+        """
+        Atomically replace the target with fn(target) and return it.
+
+        """
+        with self.__lock__:
+            target = fn(_get_target(self))
+            _set_target(self, target)
+        return target
+
+    def __compare_and_set__(self, expected, target):
+        """
+        Atomically replace the target with given one, if the current
+        target is expected. Tell if it was replaced.
+
+        """
+        with self.__lock__:
+            if _get_target(self) is not expected:
+                return False
+            _set_target(self, target)
+            return True
+
+    exec(_locked_i_op('add', '+'))
+    exec(_locked_i_op('sub', '-'))
+    exec(_locked_i_op('mul', '*'))
+    exec(_locked_i_op('truediv', '/'))
+    exec(_locked_i_op('floordiv', '//'))
+    exec(_locked_i_op('mod', '%'))
+    exec(_locked_i_op('lshift', '<<'))
+    exec(_locked_i_op('rshift', '>>'))
+    exec(_locked_i_op('and', '&'))
+    exec(_locked_i_op('xor', '^'))
+    exec(_locked_i_op('or', '|'))
+
+    def __ipow__(self, other):
+        with self.__lock__:
+            target = _get_target(self)
+            target **= other
+            _set_target(self, target)
+        return self
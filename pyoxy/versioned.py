@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import contextlib
+import copy
+import threading
+
+from .objectproxy import (
+    ObjectProxy, _compile_template, _proxy_own_attrs, _unspecified)
+
+
+_get_target = ObjectProxy.__target__.__get__
+_set_target = ObjectProxy.__target__.__set__
+
+COPY_I_OP_METHOD_TEMPLATE = """
+def __i{method}__(self, other):
+    with self.__transaction__() as draft:
+        draft {op}= other
+        self.__draft__ = draft
+    return self
+"""
+
+
+def _copy_i_op(method, op):
+    return _compile_template(
+        COPY_I_OP_METHOD_TEMPLATE.format(method=method, op=op),
+        'versioned.__i%s__' % method)
+
+
+_OWN_ATTRS = ('__version__', '__copier__', '__lock__', '__draft__')
+
+
+class VersionedProxy(ObjectProxy):
+    """
+    Proxy keeping its target as a series of immutable versions.
+
+    Writes through the proxy (attribute and item assignment and deletion,
+    in-place operators) never modify the current version: they apply to a
+    copy made with copier (copy.copy by default), which is then published
+    as the new version. Writers are serialized; readers don't lock, and
+    every read sees a complete version.
+
+    Readers needing several reads to be consistent pin the current version
+    with __snapshot__(). Versions are reclaimed (by reference counting)
+    once no snapshot or other reference holds them. __transaction__()
+    publishes several writes as a single version; writes through the proxy
+    made inside a transaction (in its thread) go to its draft.
+
+    Targets must not be modified other than through the proxy (e.g. by
+    calling their methods), and copier must copy deep enough for writes
+    not to reach objects shared with older versions.
+
+    """
+
+    __slots__ = _OWN_ATTRS
+
+    __getattribute__ = _proxy_own_attrs(
+        '__snapshot__', '__transaction__', *_OWN_ATTRS)[0]
+
+    def __init__(self, target=_unspecified, copier=copy.copy):
+        self.__version__ = 0
+        self.__copier__ = copier
+        self.__lock__ = threading.RLock()
+        self.__draft__ = _unspecified
+        super(VersionedProxy, self).__init__(target)
+
+    def __setattr__(self, attr, value):
+        if attr in _OWN_ATTRS:
+            object.__setattr__(self, attr, value)
+        elif attr == '__target__':
+            with self.__lock__:
+                _set_target(self, value)
+                self.__version__ += 1
+        else:
+            with self.__transaction__() as draft:
+                setattr(draft, attr, value)
+
+    def __delattr__(self, attr):
+        if attr in _OWN_ATTRS or attr == '__target__':
+            object.__delattr__(self, attr)
+        else:
+            with self.__transaction__() as draft:
+                delattr(draft, attr)
+
+    @contextlib.contextmanager
+    def __snapshot__(self):
+        """
+        Pin the current version for the duration of a 'with' block.
+
+        """
+        version = _get_target(self)
+        yield version
+
+    @contextlib.contextmanager
+    def __transaction__(self):
+        """
+        Yield a copy of the current version to modify in a 'with' block,
+        and publish it as the new version at its end (unless it raises).
+
+        Replacing the draft (e.g. with an in-place operator on an
+        immutable target) is done by assigning __draft__.
+
+        """
+        with self.__lock__:
+            draft = self.__draft__
+            if draft is not _unspecified:
+                # Nested in a transaction of this thread (other threads
+                # wait for the lock), which publishes the draft.
+                yield draft
+                return
+            draft = self.__copier__(_get_target(self))
+            self.__draft__ = draft
+            try:
+                yield draft
+                _set_target(self, self.__draft__)
+                self.__version__ += 1
+            finally:
+                self.__draft__ = _unspecified
+
+    def __setitem__(self, key, value):
+        with self.__transaction__() as draft:
+            draft[key] = value
+
+    def __delitem__(self, key):
+        with self.__transaction__() as draft:
+            del draft[key]
+
+    exec(_copy_i_op('add', '+'))
+    exec(_copy_i_op('sub', '-'))
+    exec(_copy_i_op('mul', '*'))
+    exec(_copy_i_op('truediv', '/'))
+    exec(_copy_i_op('floordiv', '//'))
+    exec(_copy_i_op('mod', '%'))
+    exec(_copy_i_op('lshift', '<<'))
+    exec(_copy_i_op('rshift', '>>'))
+    exec(_copy_i_op('and', '&'))
+    exec(_copy_i_op('xor', '^'))
+    exec(_copy_i_op('or', '|'))
+    exec(_copy_i_op('pow', '**'))
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import sys
+import threading
+
+from .objectproxy import ObjectProxy, _unspecified
+
+
+_deleted = object()
+
+_OWN_ATTRS = frozenset((
+    '__pending_attrs__', '__pending_items__', '__max_pending__',
+    '__flush_interval__', '__timer__', '__lock__', '__flush_error__',
+    '__buffer__', '__flush__', '__timer_flush__',
+))
+
+
+class WriteBehindProxy(ObjectProxy):
+    """
+    Proxy buffering attribute and item writes and flushing them in bulk.
+
+    __setattr__, __delattr__, __setitem__ and __delitem__ are buffered,
+    repeated writes to the same name or key coalesce to the last one.
+    Pending writes are flushed when there are max_pending of them, after
+    flush_interval seconds (if given), on explicit __flush__() call and on
+    leaving a 'with' block. Item writes are flushed with target's update()
+    method when it has one.
+
+    Attribute reads, item reads and 'in' tests of pending names and keys are
+    served from the buffer. Any other access to the target flushes first, so
+    reads through the proxy always see pending writes. Item buffering
+    assumes mapping semantics; writes with unhashable keys (like slices)
+    are applied immediately.
+
+    Errors of buffered writes (e.g. deleting a missing key) are raised by
+    the flush applying them, once: the failed write (or the update() batch
+    it was part of) is dropped, writes applied before it stay applied and
+    the others stay pending. Errors of flushes run by the flush_interval
+    timer are raised by the next flush.
+
+    'with' blocks enter and exit the target, if it's a context manager, but
+    bind the proxy rather than what target's __enter__() returns (unlike
+    PoolProxy), so that writes made in the block are buffered. The target
+    is exited even if the final flush raises.
+
+    """
+
+    __slots__ = ('__pending_attrs__', '__pending_items__', '__max_pending__',
+                 '__flush_interval__', '__timer__', '__lock__',
+                 '__flush_error__')
+
+    def __init__(self, target=_unspecified, max_pending=1000,
+                 flush_interval=None):
+        self.__pending_attrs__ = {}
+        self.__pending_items__ = {}
+        self.__max_pending__ = max_pending
+        self.__flush_interval__ = flush_interval
+        self.__timer__ = None
+        self.__lock__ = threading.RLock()
+        self.__flush_error__ = None
+        super(WriteBehindProxy, self).__init__(target)
+
+    def __getattribute__(self, attr):
+        if attr in _OWN_ATTRS:
+            return object.__getattribute__(self, attr)
+        if attr == '__target__':
+            if object.__getattribute__(self, '__pending_attrs__') or \
+                    object.__getattribute__(self, '__pending_items__'):
+                object.__getattribute__(self, '__flush__')()
+            return object.__getattribute__(self, '__target__')
+        value = object.__getattribute__(self, '__pending_attrs__').get(
+            attr, _unspecified)
+        if value is _deleted:
+            raise AttributeError(attr)
+        if value is _unspecified:
+            return getattr(self.__target__, attr)
+        return value
+
+    def __setattr__(self, attr, value):
+        if attr == '__target__':
+            if self.__pending_attrs__ or self.__pending_items__:
+                self.__flush__()
+            object.__setattr__(self, attr, value)
+        elif attr in _OWN_ATTRS:
+            object.__setattr__(self, attr, value)
+        else:
+            self.__buffer__(self.__pending_attrs__, attr, value)
+
+    def __delattr__(self, attr):
+        if attr == '__target__':
+            if self.__pending_attrs__ or self.__pending_items__:
+                self.__flush__()
+            object.__delattr__(self, attr)
+        elif attr in _OWN_ATTRS:
+            object.__delattr__(self, attr)
+        else:
+            self.__buffer__(self.__pending_attrs__, attr, _deleted)
+
+    def __buffer__(self, pending, key, value):
+        with self.__lock__:
+            pending[key] = value
+            size = len(self.__pending_attrs__) + len(self.__pending_items__)
+            if size >= self.__max_pending__:
+                self.__flush__()
+            elif self.__timer__ is None and \
+                    self.__flush_interval__ is not None:
+                timer = threading.Timer(self.__flush_interval__,
+                                        self.__timer_flush__)
+                timer.daemon = True
+                self.__timer__ = timer
+                timer.start()
+
+    def __flush__(self):
+        """
+        Apply all pending writes to the target.
+
+        """
+        with self.__lock__:
+            if self.__timer__ is not None:
+                self.__timer__.cancel()
+                self.__timer__ = None
+            error = self.__flush_error__
+            if error is not None:
+                self.__flush_error__ = None
+                raise error
+            target = object.__getattribute__(self, '__target__')
+            pending_attrs = self.__pending_attrs__
+            pending_items = self.__pending_items__
+
+            # Writes are removed from the buffer before they're applied, so
+            # that a failing one is raised once rather than on every flush.
+            for attr in list(pending_attrs):
+                value = pending_attrs.pop(attr)
+                if value is _deleted:
+                    delattr(target, attr)
+                else:
+                    setattr(target, attr, value)
+
+            if pending_items:
+                updates = dict((key, value)
+                               for key, value in pending_items.items()
+                               if value is not _deleted)
+                for key in updates:
+                    del pending_items[key]
+                if updates:
+                    try:
+                        update = target.update
+                    except AttributeError:
+                        items = list(updates.items())
+                        while items:
+                            key, value = items.pop(0)
+                            try:
+                                target[key] = value
+                            except BaseException:
+                                pending_items.update(items)
+                                raise
+                    else:
+                        update(updates)
+                for key in list(pending_items):
+                    del pending_items[key]
+                    del target[key]
+
+    def __timer_flush__(self):
+        try:
+            self.__flush__()
+        except Exception as e:
+            with self.__lock__:
+                self.__flush_error__ = e
+
+    def __getitem__(self, key):
+        try:
+            value = self.__pending_items__.get(key, _unspecified)
+        except TypeError:  # unhashable key
+            return self.__target__[key]
+        if value is _deleted:
+            raise KeyError(key)
+        if value is _unspecified:
+            return object.__getattribute__(self, '__target__')[key]
+        return value
+
+    def __setitem__(self, key, value):
+        try:
+            hash(key)
+        except TypeError:
+            self.__target__[key] = value
+        else:
+            self.__buffer__(self.__pending_items__, key, value)
+
+    def __delitem__(self, key):
+        try:
+            hash(key)
+        except TypeError:
+            del self.__target__[key]
+        else:
+            self.__buffer__(self.__pending_items__, key, _deleted)
+
+    def __contains__(self, item):
+        try:
+            value = self.__pending_items__.get(item, _unspecified)
+        except TypeError:  # unhashable item
+            return item in self.__target__
+        if value is _unspecified:
+            return item in object.__getattribute__(self, '__target__')
+        return value is not _deleted
+
+    def __enter__(self):
+        target = self.__target__
+        if hasattr(type(target), '__enter__'):
+            target.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        target = object.__getattribute__(self, '__target__')
+        exit = getattr(type(target), '__exit__', None)
+        try:
+            self.__flush__()
+        except BaseException:
+            if exit is not None:
+                exit(target, *sys.exc_info())
+            raise
+        if exit is not None:
+            return exit(target, exc_type, exc_value, traceback)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import unittest
+
+from pyoxy import AdaptiveProxy
+from pyoxy.adaptive import profile
+
+
+class Mapping(dict):
+    pass
+
+
+class Sequence(list):
+    pass
+
+
+class WarmProxy(AdaptiveProxy):
+
+    __slots__ = ()
+
+    __warmup__ = 4
+
+
+class AdaptiveProxyTest(unittest.TestCase):
+
+    def test_warmup(self):
+        class Profiled(dict):
+            pass
+
+        p = WarmProxy(Profiled({1: 2}))
+        for _ in range(3):
+            self.assertEqual(2, p[1])
+        self.assertIs(WarmProxy, type(p))
+        self.assertEqual(2, p.get(1))
+        self.assertIsNot(WarmProxy, type(p))
+        self.assertTrue(issubclass(type(p), WarmProxy))
+        self.assertEqual({'__getitem__': 3, 'get': 1}, profile(Profiled))
+
+    def test_specialized_ops(self):
+        o = Mapping({1: 2})
+        p = WarmProxy(o)
+        for _ in range(4):
+            p[1] = 2
+        self.assertNotEqual(WarmProxy, type(p))
+        p[3] = 4
+        self.assertEqual({1: 2, 3: 4}, o)
+        self.assertEqual(4, p[3])
+        self.assertIn(3, p)
+        del p[3]
+        self.assertEqual(1, len(p))
+        self.assertEqual([1], list(p))
+        self.assertTrue(p == {1: 2})
+        self.assertEqual(repr(o), repr(p))
+        self.assertEqual([1], list(p.keys()))
+        p.attr = 1
+        self.assertEqual(1, o.attr)
+        self.assertIs(o, p.__target__)
+
+    def test_type_slots(self):
+        class Counted(Mapping):
+            calls = 0
+
+            def __getitem__(self, key):
+                Counted.calls += 1
+                return dict.__getitem__(self, key)
+
+        p = WarmProxy(Counted({1: 2}))
+        for _ in range(4):
+            p[1]
+        Counted.calls = 0
+        self.assertEqual(2, p[1])
+        self.assertEqual(1, Counted.calls)
+        self.assertIs(Counted.__getitem__,
+                      type(p).__getitem__.__globals__['_slot'])
+        o = object.__getattribute__(p, '__target__')
+        o.__class__ = Mapping  # bypasses deoptimization, guarded
+        self.assertEqual(2, p[1])
+        self.assertEqual(1, Counted.calls)
+
+    def test_binary_op_fallback(self):
+        class Number(int):
+            def __radd__(self, other):
+                return 'radd'
+
+        p = WarmProxy(1)
+        for _ in range(4):
+            p + 1
+        self.assertEqual(3, p + 2)
+        self.assertEqual(1.5, p + 0.5)  # int.__add__ returns NotImplemented
+        self.assertEqual('radd', p + Number(2))
+        self.assertTrue(p == 1)
+        self.assertFalse(p == 'a')
+
+    def test_shared_specialization(self):
+        p1 = WarmProxy(Sequence([1]))
+        for _ in range(4):
+            p1[0]
+        p2 = WarmProxy(Sequence([2]))
+        self.assertIs(type(p1), type(p2))
+        self.assertEqual(2, p2[0])
+        self.assertIs(AdaptiveProxy, type(AdaptiveProxy(Sequence())))
+
+    def test_deoptimize(self):
+        class Other(object):
+            attr = 1
+
+        p = WarmProxy(Sequence([1]))
+        for _ in range(4):
+            p[0]
+        specialized = type(p)
+        p.__target__ = Other()
+        self.assertIs(WarmProxy, type(p))
+        self.assertEqual(0, p.__ops__)
+        self.assertEqual(1, p.attr)
+        p.__target__ = Sequence([2])
+        self.assertIs(specialized, type(p))
+        del p.__target__
+        self.assertIs(WarmProxy, type(p))
+        with self.assertRaises(AttributeError):
+            p.__target__
+
+    def test_in_place_op_deoptimizes(self):
+        p = WarmProxy(1)
+        for _ in range(4):
+            p + 1
+        specialized = type(p)
+        self.assertIsNot(WarmProxy, specialized)
+        p += 1
+        self.assertIs(specialized, type(p))
+        self.assertEqual(2, p)
+        p += 0.5
+        self.assertIs(WarmProxy, type(p))
+        self.assertEqual(2.5, p)
+
+    def test_no_target(self):
+        p = AdaptiveProxy()
+        with self.assertRaises(AttributeError):
+            p.attr
+        with self.assertRaises(AttributeError):
+            len(p)
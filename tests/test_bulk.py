@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import unittest
+
+from pyoxy import (
+    ObjectProxy, SourceProxy, WriteBehindProxy, ComputedProxy, del_many,
+    get_many, set_many)
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class Items(object):
+
+    def __init__(self):
+        self.items = {}
+
+    def __getitem__(self, key):
+        return self.items[key]
+
+    def __setitem__(self, key, value):
+        self.items[key] = value
+
+    def __delitem__(self, key):
+        del self.items[key]
+
+
+class BulkTest(unittest.TestCase):
+
+    def test_get_many(self):
+        d = {'a': 1, 'b': 2, 'c': 3}
+        p = ObjectProxy(ObjectProxy(d))
+        self.assertEqual(get_many(p, ['c', 'a']), [3, 1])
+        self.assertEqual(get_many(p, iter(['b'])), [2])
+        self.assertEqual(get_many(p, []), [])
+        self.assertRaises(KeyError, get_many, p, ['a', 'x'])
+        self.assertEqual(get_many(p, ['a', 'x'], None), [1, None])
+        self.assertEqual(get_many(ObjectProxy([5, 6, 7]), [-1, 0]), [7, 5])
+        self.assertEqual(get_many([5, 6], [1, 2], 0), [6, 0])
+
+    def test_get_many_default(self):
+        p = WriteBehindProxy({'a': 1})
+        p['b'] = 2
+        self.assertEqual(get_many(p, ['a', 'b', 'x'], None), [1, 2, None])
+        source = SourceProxy({'a': 1})
+        self.assertEqual(get_many(source, ['x', 'a'], 0), [0, 1])
+        o = Items()
+        o['a'] = 1
+        self.assertEqual(get_many(o, ['a', 'x'], None), [1, None])
+
+    def test_set_many(self):
+        d = {'a': 1}
+        set_many(ObjectProxy(d), {'b': 2})
+        set_many(ObjectProxy(d), [('a', 0), ('c', 3)])
+        self.assertEqual(d, {'a': 0, 'b': 2, 'c': 3})
+
+        l = list(range(5))
+        set_many(ObjectProxy(l), [(1, 'x'), (2, 'y')])
+        self.assertEqual(l, [0, 'x', 'y', 3, 4])
+        set_many(l, [(4, 'z'), (0, 'w'), (-2, 'v')])
+        self.assertEqual(l, ['w', 'x', 'y', 'v', 'z'])
+        self.assertRaises(IndexError, set_many, l, [(4, 1), (5, 2)])
+        self.assertEqual(len(l), 5)
+
+        o = Items()
+        set_many(ObjectProxy(o), [(1, 2), (3, 4)])
+        self.assertEqual(o.items, {1: 2, 3: 4})
+
+    def test_del_many(self):
+        d = {'a': 1, 'b': 2, 'c': 3}
+        del_many(ObjectProxy(d), ['a', 'c'])
+        self.assertEqual(d, {'b': 2})
+        self.assertRaises(KeyError, del_many, d, ['x'])
+
+        l = list(range(10))
+        del_many(ObjectProxy(l), [3, 4, 5])
+        self.assertEqual(l, [0, 1, 2, 6, 7, 8, 9])
+        del_many(l, [0, -1, 2, 0])
+        self.assertEqual(l, [1, 6, 7, 8])
+        self.assertRaises(IndexError, del_many, l, [10])
+        self.assertEqual(l, [1, 6, 7, 8])
+
+    def test_overriding_proxies(self):
+        d = {}
+        p = WriteBehindProxy(d)
+        set_many(p, {'a': 1, 'b': 2})
+        self.assertEqual(d, {})
+        self.assertEqual(get_many(p, ['a', 'b']), [1, 2])
+        p.__flush__()
+        self.assertEqual(d, {'a': 1, 'b': 2})
+
+        source = SourceProxy({'a': 1})
+        computed = ComputedProxy(lambda: source['a'] * 10)
+        self.assertEqual(computed + 0, 10)
+        set_many(source, {'a': 2})
+        self.assertEqual(computed + 0, 20)
+
+    @unittest.skipIf(numpy is None, 'numpy is not available')
+    def test_numpy(self):  # pragma: no cover
+        a = numpy.arange(10)
+        self.assertEqual(get_many(ObjectProxy(a), [1, 3]).tolist(), [1, 3])
+        set_many(ObjectProxy(a), [(0, 5), (9, 6)])
+        self.assertEqual(a[[0, 9]].tolist(), [5, 6])
+        self.assertEqual(get_many(a, [1, 10], -1), [1, -1])
+
+        m = numpy.arange(6).reshape(2, 3)
+        self.assertEqual(get_many(m, [(0, 1), (1, 2)]).tolist(), [1, 5])
+        self.assertEqual(get_many(m, [1]).tolist(), [[3, 4, 5]])
+        self.assertEqual(get_many(m, []).tolist(), [])
+        set_many(ObjectProxy(m), [((0, 0), 7), ((1, 1), 8)])
+        self.assertEqual(m.tolist(), [[7, 1, 2], [3, 8, 5]])
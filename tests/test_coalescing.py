@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import threading
+import time
+import unittest
+
+from pyoxy import AsyncCoalescingProxy, CoalescingProxy
+from pyoxy.coalescing import _call_key
+
+try:  # pragma: no cover
+    import asyncio
+except ImportError:  # pragma: no cover
+    asyncio = None
+
+
+class CoalescingProxyTest(unittest.TestCase):
+
+    def run_concurrently(self, p, args_list):
+        results = [None] * len(args_list)
+
+        def run(i, args):
+            try:
+                results[i] = p(*args)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(i, args))
+                   for i, args in enumerate(args_list)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_coalesce(self):
+        calls = []
+        release = threading.Event()
+
+        def target(x):
+            calls.append(x)
+            release.wait()
+            return x * 2
+
+        p = CoalescingProxy(target)
+        threads, results = self.run_concurrently(p, [(1,)] * 5 + [(2,)])
+        # Give followers time to join in-flight calls.
+        while len(calls) < 2:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([1, 2], sorted(calls))
+        self.assertEqual([2] * 5 + [4], results)
+        self.assertEqual({}, p.__flights__)
+
+    def test_coalesce_error(self):
+        started = threading.Event()
+        release = threading.Event()
+        error = ValueError()
+
+        def target():
+            started.set()
+            release.wait()
+            raise error
+
+        p = CoalescingProxy(target)
+        threads, results = self.run_concurrently(p, [()])
+        started.wait()
+        more_threads, more_results = self.run_concurrently(p, [()] * 3)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads + more_threads:
+            thread.join()
+        self.assertEqual([error] * 4, results + more_results)
+
+    def test_sequential_calls_are_not_cached(self):
+        calls = []
+        p = CoalescingProxy(lambda x, y=0: calls.append((x, y)) or len(calls))
+        self.assertEqual(1, p(1))
+        self.assertEqual(2, p(1))
+        self.assertEqual(3, p(1, y=2))
+        self.assertEqual([(1, 0), (1, 0), (1, 2)], calls)
+
+    def test_call_keys(self):
+        calls = [
+            ((1,), {}), ((True,), {}), ((1.0,), {}), (((1,),), {}),
+            (((True,),), {}), ((frozenset([1]),), {}),
+            ((frozenset([1.0]),), {}), ((), {'x': 1}), ((), {'x': True}),
+            (((), frozenset({'x': 1}.items())), {}),
+        ]
+        keys = set(_call_key(args, kwargs) for args, kwargs in calls)
+        self.assertEqual(len(calls), len(keys))
+        self.assertEqual(_call_key((1,), {'x': 1, 'y': 2}),
+                         _call_key((1,), {'y': 2, 'x': 1}))
+
+    def test_unhashable_args(self):
+        p = CoalescingProxy(len)
+        self.assertEqual(2, p([1, 2]))
+
+    def test_attr(self):
+        p = CoalescingProxy(len)
+        self.assertEqual('len', p.__name__)
+        self.assertIs(len, p.__target__)
+
+
+@unittest.skipIf(asyncio is None, 'asyncio is not available')
+class AsyncCoalescingProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_in_loop(self, fn):
+        """
+        Call fn() inside the running loop and wait for the returned awaitable.
+
+        """
+        started = self.loop.create_future()
+        self.loop.call_soon(lambda: started.set_result(fn()))
+        return self.loop.run_until_complete(
+            self.loop.run_until_complete(started))
+
+    def test_coalesce(self):
+        calls = []
+
+        def target(x):
+            calls.append(x)
+            return asyncio.sleep(0.01, result=x * 2)
+
+        p = AsyncCoalescingProxy(target)
+        results = self.run_in_loop(
+            lambda: asyncio.gather(p(1), p(1), p(2), p(1)))
+        self.assertEqual([1, 2], sorted(calls))
+        self.assertEqual([2, 2, 4, 2], results)
+        self.assertEqual({}, p.__flights__)
+
+    def test_coalesce_error(self):
+        def target():
+            future = self.loop.create_future()
+            self.loop.call_later(0.01, future.set_exception, ValueError())
+            return future
+
+        p = AsyncCoalescingProxy(target)
+        results = self.run_in_loop(
+            lambda: asyncio.gather(p(), p(), return_exceptions=True))
+        self.assertIsInstance(results[0], ValueError)
+        self.assertIs(results[0], results[1])
+
+    def test_cancel_waiter(self):
+        p = AsyncCoalescingProxy(lambda: asyncio.sleep(0.01, result=1))
+
+        def calls():
+            first = p()
+            second = p()
+            first.cancel()
+            return asyncio.gather(second)
+
+        self.assertEqual([1], self.run_in_loop(calls))
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import asyncio
+import threading
+import time
+import unittest
+
+from pyoxy import DeadlineExceeded, DeadlineProxy, LatencyStats, remaining
+
+
+class Backend(object):
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.calls = []
+        self.budgets = []
+
+    def get(self, key):
+        self.calls.append(key)
+        self.budgets.append(remaining())
+        time.sleep(self.delay)
+        return 'value of %s' % key
+
+    def __call__(self, key):
+        return self.get(key)
+
+
+class AsyncBackend(object):
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.cancelled = []
+
+    async def get(self, key):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(key)
+            raise
+        return 'value of %s' % key
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def tearDown(self):
+        for proxy in getattr(self, 'proxies', ()):
+            proxy.__shutdown__()
+
+    def proxy(self, *args, **kwargs):
+        proxy = DeadlineProxy(*args, **kwargs)
+        self.proxies = getattr(self, 'proxies', []) + [proxy]
+        return proxy
+
+    def test_within_budget(self):
+        backend = Backend()
+        p = self.proxy(backend, 1.0)
+        self.assertEqual(p('a'), 'value of a')
+        self.assertEqual(p.get('b'), 'value of b')
+        self.assertEqual(p.delay, 0)
+        self.assertEqual(backend.calls, ['a', 'b'])
+        self.assertTrue(0 < backend.budgets[0] <= 1.0)
+        self.assertIsNone(remaining())
+        self.assertEqual(set(p.__stats__.latencies), set(['__call__', 'get']))
+
+    def test_errors(self):
+        p = self.proxy({}, 1.0)
+        self.assertRaises(KeyError, p.pop, 'a')
+        self.assertEqual(p.__stats__.timeouts, {})
+
+    def test_timeout(self):
+        backend = Backend()
+        p = self.proxy(backend, 0.05)
+        start = time.time()
+        backend.delay = 0.2
+        self.assertRaises(DeadlineExceeded, p.get, 'a')
+        self.assertLess(time.time() - start, 0.15)
+        self.assertEqual(p.__stats__.timeouts['get'], 1)
+
+    def test_stale(self):
+        backend = Backend()
+        p = self.proxy(backend, 0.05)
+        self.assertEqual(p.get('a'), 'value of a')
+        backend.delay = 0.2
+        self.assertEqual(p.get('a'), 'value of a')
+        self.assertRaises(DeadlineExceeded, p.get, 'b')
+        self.assertRaises(DeadlineExceeded, p.get, ['unhashable'])
+
+        p = self.proxy(Backend(0.2), 0.05, stale=False)
+        self.assertRaises(DeadlineExceeded, p.get, 'a')
+
+    def test_fallback(self):
+        p = self.proxy(Backend(0.2), 0.05, fallback=Backend())
+        self.assertEqual(p.get('a'), 'value of a')
+        self.assertEqual(p('b'), 'value of b')
+
+    def test_skip_queued(self):
+        backend = Backend(0.1)
+        p = self.proxy(backend, 0.05, max_workers=1)
+        errors = []
+
+        def get(key):
+            try:
+                p.get(key)
+            except DeadlineExceeded as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=get, args=(key,)) for key in 'abc']
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time.sleep(0.15)
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(len(backend.calls), 1)
+
+    def test_percentiles(self):
+        stats = LatencyStats(window=100)
+        self.assertEqual(stats.percentiles(), {})
+        for i in range(1, 201):
+            stats.record('__call__', i)
+        self.assertEqual(stats.percentiles(), {50: 150, 90: 190, 99: 199})
+        self.assertEqual(stats.percentiles(percentiles=(0, 100)),
+                         {0: 101, 100: 200})
+
+    def test_async(self):
+        async def run():
+            backend = AsyncBackend()
+            p = self.proxy(backend, 0.05, fallback=Backend())
+            self.assertEqual(await p.get('a'), 'value of a')
+            backend.delay = 0.2
+            self.assertEqual(await p.get('a'), 'value of a')
+            self.assertEqual(await p.get('b'), 'value of b')
+            self.assertEqual(backend.cancelled, ['a', 'b'])
+            self.assertEqual(p.__stats__.timeouts['get'], 2)
+            self.assertEqual(len(p.__stats__.latencies['get']), 1)
+
+            p = self.proxy(backend, 0.05, fallback=AsyncBackend())
+            self.assertEqual(await p.get('c'), 'value of c')
+            p = self.proxy(backend, 0.05)
+            with self.assertRaises(DeadlineExceeded):
+                await p.get('d')
+
+        asyncio.run(run())
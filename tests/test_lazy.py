@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from pyoxy import LazyModule, LazyProxy, ObjectProxy, lazy_import
+from pyoxy.lazy import import_times
+
+
+class LazyProxyTest(unittest.TestCase):
+
+    def test_resolve_once(self):
+        calls = []
+        p = LazyProxy(lambda: calls.append(1) or {'a': 1})
+        self.assertEqual([], calls)
+        self.assertEqual(1, p['a'])
+        self.assertEqual(['a'], list(p.keys()))
+        self.assertEqual([1], calls)
+
+    def test_resolve_concurrently(self):
+        calls = []
+
+        def factory():
+            calls.append(1)
+            time.sleep(0.01)
+            return [1]
+
+        p = LazyProxy(factory)
+        threads = [threading.Thread(target=len, args=(p,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([1], calls)
+
+    def test_resolve_error(self):
+        results = [ValueError(), 1]
+
+        def factory():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        p = LazyProxy(factory)
+        with self.assertRaises(ValueError):
+            p + 1
+        self.assertEqual(2, p + 1)
+
+    def test_set_target(self):
+        p = LazyProxy(None)
+        p.__target__ = 1
+        self.assertEqual(1, p.__target__)
+
+
+class LazyModuleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        sys.path.insert(0, self.dir)
+        self.name = 'pyoxy_lazy_test_module'
+        with open(os.path.join(self.dir, self.name + '.py'), 'w') as f:
+            f.write('value = 1\n')
+
+    def tearDown(self):
+        sys.path.remove(self.dir)
+        sys.modules.pop(self.name, None)
+        shutil.rmtree(self.dir)
+
+    def test_lazy_import(self):
+        p = lazy_import(self.name)
+        self.assertIsInstance(p, LazyModule)
+        self.assertIs(p, sys.modules[self.name])
+        self.assertIs(p, lazy_import(self.name))
+        module = __import__(self.name)
+        self.assertIs(p, module)
+        self.assertNotIn(self.name, import_times)
+
+        self.assertEqual(1, p.value)
+        module = sys.modules[self.name]
+        self.assertNotIsInstance(module, ObjectProxy)
+        self.assertIs(module, p.__target__)
+        self.assertIs(module, lazy_import(self.name))
+        self.assertIn(self.name, import_times)
+
+    def test_lazy_import_error(self):
+        p = lazy_import('pyoxy_lazy_test_missing_module')
+        try:
+            with self.assertRaises(ImportError):
+                p.value
+            self.assertIs(p, sys.modules['pyoxy_lazy_test_missing_module'])
+        finally:
+            del sys.modules['pyoxy_lazy_test_missing_module']
+
+    def test_imported(self):
+        self.assertIs(os, lazy_import('os'))
+
+    def test_unregistered(self):
+        p = LazyModule(self.name)
+        self.assertEqual(1, p.value)
+        self.assertIs(sys.modules[self.name], p.__target__)
+
+
+class PackageImportTest(unittest.TestCase):
+
+    def test_submodules_imported_on_use(self):
+        code = ('import sys, pyoxy; '
+                'print(sorted(m for m in ("asyncio", "json", "pyoxy.pool") '
+                'if m in sys.modules)); '
+                'pyoxy.PoolProxy; print("pyoxy.pool" in sys.modules)')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         cwd=root)
+        self.assertEqual(output.decode().split(), ['[]', 'True'])
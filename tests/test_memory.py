@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import sys
+import unittest
+
+from pyoxy import (
+    ComputedProxy, LazyProxy, ObjectProxy, SourceProxy, WriteBehindProxy,
+    deep_sizeof, format_report, memory_report)
+
+
+class Object(object):
+    pass
+
+
+class MemoryTest(unittest.TestCase):
+
+    def test_sizeof(self):
+        target = list(range(100))
+        proxy = ObjectProxy(target)
+        self.assertGreater(sys.getsizeof(proxy), sys.getsizeof(target))
+        self.assertEqual(sys.getsizeof(proxy) - sys.getsizeof(target),
+                         sys.getsizeof(ObjectProxy()))
+
+    def test_sizeof_lazy(self):
+        calls = []
+        proxy = LazyProxy(lambda: calls.append(1) or [1, 2, 3])
+        sys.getsizeof(proxy)
+        self.assertEqual(calls, [])
+
+    def test_deep_sizeof(self):
+        inner = [b'x' * 1000]
+        outer = [inner, inner]
+        self.assertGreater(deep_sizeof(outer), 1000)
+        self.assertEqual(deep_sizeof(outer),
+                         sys.getsizeof(outer) + deep_sizeof(inner))
+        seen = set()
+        deep_sizeof(inner, seen)
+        self.assertEqual(deep_sizeof(outer, seen), sys.getsizeof(outer))
+
+    def test_deep_sizeof_proxy(self):
+        self.assertGreater(deep_sizeof(ObjectProxy(len)), 0)
+        calls = []
+        proxy = LazyProxy(lambda: calls.append(1) or [1, 2, 3])
+        self.assertGreater(deep_sizeof(proxy), 0)
+        self.assertEqual(calls, [])
+
+    def test_report(self):
+        shared = [b'x' * 1000]
+        proxies = [ObjectProxy(shared), ObjectProxy(shared),
+                   ObjectProxy({'a': 1}), ObjectProxy()]
+        report = memory_report(proxies)
+        self.assertEqual(set(report), set([list, dict, None]))
+        self.assertEqual(report[list].proxies, 2)
+        self.assertEqual(report[list].targets, 1)
+        self.assertEqual(report[list].target_bytes, deep_sizeof(shared))
+        self.assertEqual(report[None].targets, 0)
+        self.assertEqual(report[None].target_bytes, 0)
+        self.assertEqual(report[None].proxy_bytes,
+                         report[dict].proxy_bytes)
+
+        shallow = memory_report(proxies, deep=False)
+        self.assertEqual(shallow[list].target_bytes, sys.getsizeof(shared))
+
+    def test_report_chain(self):
+        target = Object()
+        report = memory_report([ObjectProxy(ObjectProxy(target))])
+        self.assertEqual(list(report), [Object])
+        self.assertEqual(report[Object].proxies, 1)
+        self.assertEqual(report[Object].proxy_bytes,
+                         2 * memory_report([ObjectProxy(1)])[int].proxy_bytes)
+
+    def test_report_proxy_state(self):
+        plain = memory_report([ObjectProxy({})])[dict]
+        buffered = WriteBehindProxy({})
+        buffered['a'] = b'x' * 1000
+        usage = memory_report([buffered])[dict]
+        self.assertGreater(usage.proxy_bytes, plain.proxy_bytes + 1000)
+        self.assertEqual(usage.target_bytes, plain.target_bytes)
+        buffered.__flush__()
+
+    def test_report_proxies_in_state(self):
+        values = [b'x' * 100000]
+        source = SourceProxy(values)
+        computed = ComputedProxy(lambda: len(source[0]))
+        self.assertEqual(computed + 0, 100000)
+        report = memory_report([computed, source])
+        self.assertLess(report[int].proxy_bytes, 10000)
+        self.assertEqual(report[list].targets, 1)
+        self.assertEqual(report[list].target_bytes, deep_sizeof(values))
+
+    def test_format_report(self):
+        text = format_report(memory_report([ObjectProxy([1]), ObjectProxy()]))
+        lines = text.splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('builtins.list', text)
+        self.assertIn('None', lines[2])
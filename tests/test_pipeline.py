@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import unittest
+
+from pyoxy import PipelineProxy
+from pyoxy.pipeline import _fused_loops
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class PipelineTest(unittest.TestCase):
+
+    def test_lazy(self):
+        calls = []
+
+        def double(x):
+            calls.append(x)
+            return 2 * x
+
+        data = [1, 2, 3]
+        p = PipelineProxy(data).__map__(double)
+        self.assertEqual(calls, [])
+        self.assertEqual(list(p), [2, 4, 6])
+        self.assertEqual(calls, [1, 2, 3])
+        self.assertEqual(list(p), [2, 4, 6])
+        self.assertEqual(p.count(2), 1)  # attributes are the target's
+
+    def test_unstaged_ops(self):
+        p = PipelineProxy([1, 2, 3])
+        self.assertEqual(len(p), 3)
+        self.assertEqual(p[0], 1)
+        self.assertIn(1, p)
+        doubled = p.__map__(lambda x: 2 * x)
+        self.assertIn(4, doubled)
+        self.assertNotIn(1, doubled)
+        for op in (len, reversed, next, lambda p: p[0]):
+            self.assertRaises(TypeError, op, doubled)
+
+    def test_subclass(self):
+        class Pipeline(PipelineProxy):
+            __slots__ = ()
+
+        p = Pipeline([1, 2]).__map__(str).__take__(1)
+        self.assertIs(Pipeline, type(p))
+        self.assertEqual(list(p), ['1'])
+
+    def test_stages_are_immutable(self):
+        p = PipelineProxy(range(10))
+        evens = p.__filter__(lambda x: x % 2 == 0)
+        self.assertEqual(list(p), list(range(10)))
+        self.assertEqual(list(evens), [0, 2, 4, 6, 8])
+        self.assertEqual(list(evens.__take__(2)), [0, 2])
+        self.assertEqual(list(evens), [0, 2, 4, 6, 8])
+
+    def test_fused(self):
+        p = (PipelineProxy(range(20))
+             .__map__(lambda x: x * 2)
+             .__filter__(lambda x: x % 3)
+             .__map__(lambda x: x + 1))
+        self.assertEqual(list(p), [x * 2 + 1 for x in range(20) if x * 2 % 3])
+        self.assertIn(('map', 'filter', 'map'), _fused_loops)
+
+    def test_take(self):
+        consumed = []
+
+        def source():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        p = PipelineProxy(source()).__filter__(lambda x: x % 2).__take__(3)
+        self.assertEqual(list(p), [1, 3, 5])
+        self.assertEqual(consumed, list(range(6)))
+        self.assertEqual(list(PipelineProxy([1]).__take__(0)), [])
+
+    def test_batch(self):
+        p = PipelineProxy(range(7)).__batch__(3)
+        self.assertEqual(list(p), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(p.__map__(sum).__take__(2)), [3, 12])
+        self.assertRaises(ValueError, p.__batch__, 0)
+
+    @unittest.skipIf(numpy is None, 'numpy is not available')
+    def test_chunk(self):  # pragma: no cover
+        p = (PipelineProxy(range(10))
+             .__chunk__(4, 'float64')
+             .__map__(numpy.sqrt)
+             .__filter__(lambda a: a > 1.5, vectorized=True))
+        chunks = list(p)
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 4, 2])
+        self.assertEqual(chunks[0].dtype, numpy.float64)
+        self.assertEqual(numpy.concatenate(chunks).tolist(),
+                         [x ** 0.5 for x in range(10) if x ** 0.5 > 1.5])
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import contextlib
+import threading
+import unittest
+
+from pyoxy import PoolProxy, PoolTimeout
+
+
+class Connection(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.closed = False
+
+    def query(self, value):
+        self.calls += 1
+        return self.name, value
+
+    def __call__(self, value):
+        return self.query(value)
+
+
+class PoolProxyTest(unittest.TestCase):
+
+    def test_round_robin(self):
+        c1, c2 = Connection(1), Connection(2)
+        p = PoolProxy([c1, c2])
+        self.assertEqual((1, 'a'), p.query('a'))
+        self.assertEqual((2, 'b'), p('b'))
+        self.assertEqual((1, 'c'), p.query('c'))
+        self.assertEqual([0, 0], [e.load for e in p.__entries__])
+
+    def test_least_loaded(self):
+        c1, c2 = Connection(1), Connection(2)
+        p = PoolProxy([c1, c2], max_uses=2, policy='least_loaded')
+        with p as first:
+            name = threading_call(lambda: p.query('a'))[0]
+            self.assertNotEqual(first.name, name)
+            with p as second:
+                self.assertIsNot(first, second)
+                with p as third:
+                    self.assertIn(third, [c1, c2])
+        self.assertEqual([0, 0], [e.load for e in p.__entries__])
+
+    def test_random(self):
+        c1, c2 = Connection(1), Connection(2)
+        p = PoolProxy([c1, c2], policy='random')
+        names = set(p.query(i)[0] for i in range(50))
+        self.assertTrue(names.issubset(set([1, 2])))
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            PoolProxy(policy='fifo')
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            PoolProxy(factory=lambda: Connection(0))
+        with self.assertRaises(ValueError):
+            PoolProxy()
+
+    def test_attr(self):
+        p = PoolProxy([Connection(1)])
+        self.assertEqual(1, p.name)
+        self.assertEqual('<pooled method query>', repr(p.query))
+        with self.assertRaises(AttributeError):
+            p.__target__
+        with self.assertRaises(AttributeError):
+            p.name = 2
+
+    def test_with(self):
+        c1, c2 = Connection(1), Connection(2)
+        p = PoolProxy([c1, c2])
+        with p as conn:
+            self.assertIs(c1, conn)
+            self.assertIs(c1, p.__target__)
+            self.assertEqual((1, 'a'), p.query('a'))
+            self.assertEqual((1, 'b'), p('b'))
+            p.name = 3
+            # Other callers get the other connection.
+            self.assertEqual((2, 'c'), threading_call(lambda: p.query('c')))
+        self.assertEqual(3, c1.name)
+        self.assertEqual([0, 0], [e.load for e in p.__entries__])
+
+    def test_with_context_manager_target(self):
+        state = []
+
+        @contextlib.contextmanager
+        def manager():
+            state.append('enter')
+            yield 'value'
+            state.append('exit')
+
+        p = PoolProxy([manager(), manager()])
+        with p as value:
+            self.assertEqual('value', value)
+        self.assertEqual(['enter', 'exit'], state)
+
+    def test_timeout(self):
+        p = PoolProxy([Connection(1)], timeout=0.01)
+        with p:
+            with self.assertRaises(PoolTimeout):
+                threading_call(lambda: p.query('a'))
+
+    def test_wait(self):
+        p = PoolProxy([Connection(1)], timeout=5)
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with p:
+                entered.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        entered.wait()
+        timer = threading.Timer(0.01, release.set)
+        timer.start()
+        self.assertEqual((1, 'a'), p.query('a'))
+        thread.join()
+
+    def test_factory(self):
+        created = []
+
+        def factory():
+            created.append(Connection(len(created)))
+            return created[-1]
+
+        p = PoolProxy(factory=factory, size=2, timeout=0.01)
+        self.assertEqual((0, 'a'), p.query('a'))
+        self.assertEqual(1, len(created))
+        with p:
+            self.assertEqual((1, 'b'), threading_call(lambda: p.query('b')))
+            with p:
+                with self.assertRaises(PoolTimeout):
+                    threading_call(lambda: p.query('c'))
+        self.assertEqual(2, len(created))
+
+    def test_healthy(self):
+        c1, c2 = Connection(1), Connection(2)
+        c1.closed = True
+        disposed = []
+        p = PoolProxy([c1, c2], healthy=lambda c: not c.closed,
+                      dispose=disposed.append)
+        self.assertEqual((2, 'a'), p.query('a'))
+        self.assertEqual([c1], disposed)
+        self.assertEqual([c2], [e.target for e in p.__entries__])
+
+    def test_healthy_error(self):
+        def healthy(c):
+            if c.closed:
+                raise IOError('probe failed')
+            return True
+
+        c1, c2 = Connection(1), Connection(2)
+        p = PoolProxy([c1], healthy=healthy, timeout=0.01)
+        c1.closed = True
+        self.assertRaises(IOError, p.query, 'a')
+        c1.closed = False
+        self.assertEqual((1, 'a'), p.query('a'))
+
+        disposed = []
+        p = PoolProxy([c1, c2], healthy=healthy, eject_on=(IOError,),
+                      dispose=disposed.append, timeout=0.01)
+        c1.closed = True
+        self.assertRaises(IOError, p.query, 'a')
+        self.assertEqual([c1], disposed)
+        self.assertEqual((2, 'a'), p.query('a'))
+
+    def test_eject_on(self):
+        class Broken(Connection):
+            def query(self, value):
+                raise IOError()
+
+        c1, c2 = Broken(1), Connection(2)
+        p = PoolProxy([c1, c2], eject_on=[IOError])
+        with self.assertRaises(IOError):
+            p.query('a')
+        self.assertEqual((2, 'b'), p.query('b'))
+        self.assertEqual([c2], [e.target for e in p.__entries__])
+        with self.assertRaises(ValueError):
+            with p:
+                raise ValueError()
+        self.assertEqual([c2], [e.target for e in p.__entries__])
+        with self.assertRaises(IOError):
+            with p:
+                raise IOError()
+        self.assertEqual([], p.__entries__)
+
+    def test_eject(self):
+        c1, c2 = Connection(1), Connection(2)
+        p = PoolProxy([c1, c2])
+        p.__eject__(c1)
+        p.__eject__(c1)
+        self.assertEqual((2, 'a'), p.query('a'))
+
+
+def threading_call(fn):
+    """
+    Call fn in another thread, return its result or raise its exception.
+
+    """
+    result = []
+
+    def run():
+        try:
+            result.append((True, fn()))
+        except Exception as e:
+            result.append((False, e))
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    ok, value = result[0]
+    if not ok:
+        raise value
+    return value
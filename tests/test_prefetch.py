@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import asyncio
+import threading
+import time
+import unittest
+
+from pyoxy import AsyncPrefetchProxy, Prefetcher, PrefetchProxy
+
+
+class Source(object):
+
+    def __init__(self, n, fail_at=None):
+        self.n = n
+        self.fail_at = fail_at
+        self.produced = []
+        self.closed = threading.Event()
+        self.threads = set()
+
+    def __iter__(self):
+        try:
+            for i in range(self.n):
+                self.threads.add(threading.current_thread())
+                if i == self.fail_at:
+                    raise ValueError(i)
+                self.produced.append(i)
+                yield i
+        finally:
+            self.closed.set()
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_iter(self):
+        for chunk_size in (1, 3, 10, 100):
+            source = Source(10)
+            self.assertEqual(
+                list(PrefetchProxy(source, depth=2, chunk_size=chunk_size)),
+                list(range(10)))
+            self.assertNotIn(threading.current_thread(), source.threads)
+            self.assertTrue(source.closed.wait(1))
+
+    def test_iterator_left_open(self):
+        class Cursor(object):
+            closed = False
+
+            def __init__(self):
+                self.rows = iter([1, 2])
+
+            def __iter__(self):
+                return self
+
+            def __next__(self):
+                return next(self.rows)
+
+            def close(self):
+                self.closed = True
+
+        cursor = Cursor()
+        self.assertEqual(list(PrefetchProxy(cursor)), [1, 2])
+        self.assertFalse(cursor.closed)
+        cursor = Cursor()
+        it = Prefetcher(cursor, depth=1)
+        self.assertEqual(next(it), 1)
+        it.close()
+        deadline = time.time() + 1
+        while not cursor.closed and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(cursor.closed)
+
+    def test_next(self):
+        proxy = PrefetchProxy(iter([1, 2, 3]))
+        self.assertEqual(next(proxy), 1)
+        self.assertEqual(next(proxy), 2)
+        self.assertEqual(next(proxy), 3)
+        self.assertRaises(StopIteration, next, proxy)
+
+    def test_resume(self):
+        proxy = PrefetchProxy(iter(range(10)), depth=4)
+        for item in proxy:
+            if item == 2:
+                break
+        self.assertEqual(next(proxy), 3)
+        self.assertEqual(list(proxy), list(range(4, 10)))
+        source = Source(3)
+        proxy = PrefetchProxy(source)
+        self.assertEqual(list(proxy), list(range(3)))
+        self.assertEqual(list(proxy), list(range(3)))  # not an iterator
+        self.assertIsNone(proxy.__prefetcher__)
+
+    def test_prefetch_ahead(self):
+        source = Source(100)
+        it = iter(PrefetchProxy(source, depth=2, chunk_size=5))
+        self.assertEqual(next(it), 0)
+        deadline = time.time() + 1
+        while len(source.produced) < 15 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        # One chunk consumed, two buffered and one waiting for room.
+        self.assertEqual(len(source.produced), 20)
+        it.close()
+
+    def test_error(self):
+        source = Source(10, fail_at=5)
+        it = Prefetcher(source, chunk_size=2)
+        self.assertEqual([next(it) for _ in range(4)], [0, 1, 2, 3])
+        self.assertRaises(ValueError, next, it)
+        self.assertRaises(StopIteration, next, it)
+        self.assertRaises(TypeError, next, Prefetcher(1))
+
+    def test_close(self):
+        source = Source(1000)
+        with Prefetcher(source, depth=1) as it:
+            self.assertEqual(next(it), 0)
+        self.assertTrue(source.closed.wait(1))
+        self.assertRaises(StopIteration, next, it)
+        self.assertLess(len(source.produced), 10)
+
+        source = Source(1000)
+        it = Prefetcher(source, depth=1)
+        next(it)
+        del it
+        self.assertTrue(source.closed.wait(1))
+
+        source = Source(1000)
+        proxy = PrefetchProxy(source, depth=1)
+        next(proxy)
+        proxy.__close__()
+        self.assertTrue(source.closed.wait(1))
+        self.assertRaises(ValueError, Prefetcher, [], depth=0)
+
+    def test_async_for(self):
+        async def consume():
+            return [item async for item in PrefetchProxy(Source(10),
+                                                         chunk_size=3)]
+        self.assertEqual(asyncio.run(consume()), list(range(10)))
+
+
+async def agen(n, log, fail_at=None, delay=0):
+    try:
+        for i in range(n):
+            if delay:
+                await asyncio.sleep(delay)
+            if i == fail_at:
+                raise ValueError(i)
+            log.append(i)
+            yield i
+    finally:
+        log.append('closed')
+
+
+class AsyncPrefetchTest(unittest.TestCase):
+
+    def test_iter(self):
+        async def consume():
+            log = []
+            return [item async for item in AsyncPrefetchProxy(agen(5, log))]
+        self.assertEqual(asyncio.run(consume()), list(range(5)))
+
+    def test_prefetch_ahead(self):
+        async def consume():
+            log = []
+            proxy = AsyncPrefetchProxy(agen(100, log), depth=3)
+            self.assertEqual(await anext(proxy), 0)
+            await asyncio.sleep(0.05)
+            self.assertEqual(log, [0, 1, 2, 3])
+            proxy.__close__()
+            await asyncio.sleep(0.05)
+            self.assertEqual(log[-1], 'closed')
+            with self.assertRaises(StopAsyncIteration):
+                await anext(proxy)
+        asyncio.run(consume())
+
+    def test_resume(self):
+        async def consume():
+            log = []
+            proxy = AsyncPrefetchProxy(agen(10, log), depth=4)
+            async for item in proxy:
+                if item == 2:
+                    break
+            self.assertEqual(await anext(proxy), 3)
+            return [item async for item in proxy]
+        self.assertEqual(asyncio.run(consume()), list(range(4, 10)))
+
+    def test_overlap(self):
+        async def consume():
+            log = []
+            start = time.time()
+            async for item in AsyncPrefetchProxy(agen(5, log, delay=0.02)):
+                await asyncio.sleep(0.02)
+            return time.time() - start
+        self.assertLess(asyncio.run(consume()), 0.18)
+
+    def test_error(self):
+        async def consume():
+            log = []
+            result = []
+            with self.assertRaises(ValueError):
+                async for item in AsyncPrefetchProxy(agen(5, log, 3)):
+                    result.append(item)
+            return result
+        self.assertEqual(asyncio.run(consume()), [0, 1, 2])
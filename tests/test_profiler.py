@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import io
+import os
+import signal
+import sys
+import tempfile
+import time
+import unittest
+
+from pyoxy import (
+    ObjectProxy, PipelineProxy, ProxyProfiler, ThreadSafeProxy,
+    VersionedProxy, record, signal_toggle)
+from pyoxy.profiler import _is_proxy_frame
+
+
+class Slow(object):
+
+    def __add__(self, other):
+        time.sleep(0.0005)
+        return self
+
+
+def work(profiler, samples=30):
+    deadline = time.time() + 5
+    p = ObjectProxy(ObjectProxy(Slow()))
+    while profiler.samples < samples and time.time() < deadline:
+        for _ in range(10):
+            p + 1
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_profile(self):
+        with ProxyProfiler(interval=0.001) as profiler:
+            self.assertTrue(profiler.running)
+            work(profiler)
+        self.assertFalse(profiler.running)
+        self.assertGreater(profiler.samples, 0)
+        self.assertIn('Slow', profiler.by_target_type(total=True))
+        self.assertTrue(any(site.startswith('work (test_profiler.py:')
+                            for site in profiler.by_call_site(total=True)))
+
+        f = io.StringIO()
+        profiler.write_folded(f)
+        lines = f.getvalue().splitlines()
+        self.assertTrue(lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        self.assertGreater(int(count), 0)
+        frames = stack.split(';')
+        self.assertIn('ObjectProxy.__add__ [ObjectProxy]', frames)
+        self.assertIn('ObjectProxy.__add__ [Slow]', frames)
+        self.assertLess(frames.index('ObjectProxy.__add__ [ObjectProxy]'),
+                        frames.index('ObjectProxy.__add__ [Slow]'))
+
+    def test_weighted_self_and_total_time(self):
+        def busy(seconds):
+            deadline = time.time() + seconds
+            while time.time() < deadline:
+                pass
+
+        with ProxyProfiler(interval=0.001) as profiler:
+            ObjectProxy(busy)(0.3)
+        total = sum(profiler.by_call_site(total=True).values())
+        self.assertGreater(total, 0.2)
+        self.assertLess(total, 0.5)
+        self.assertLess(sum(profiler.by_call_site().values()), total / 2)
+        self.assertLessEqual(sum(profiler.by_target_type().values()),
+                             sum(profiler.by_target_type(True).values()))
+
+    def test_no_proxies(self):
+        profiler = ProxyProfiler(interval=0.001)
+        profiler.start()
+        profiler.start()
+        deadline = time.time() + 5
+        while profiler.samples < 5 and time.time() < deadline:
+            sum(range(1000))
+        profiler.stop()
+        profiler.stop()
+        self.assertEqual(profiler.stacks, {})
+        self.assertEqual(profiler.by_call_site(), {})
+
+    @unittest.skipUnless(hasattr(signal, 'SIGUSR2'), 'needs SIGUSR2')
+    def test_signal_toggle(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        previous = signal.getsignal(signal.SIGUSR2)
+        try:
+            profiler = signal_toggle(path, interval=0.001)
+            os.kill(os.getpid(), signal.SIGUSR2)
+            self.assertTrue(profiler.running)
+            work(profiler)
+            os.kill(os.getpid(), signal.SIGUSR2)
+            self.assertFalse(profiler.running)
+            with open(path) as f:
+                self.assertIn('[Slow]', f.read())
+        finally:
+            signal.signal(signal.SIGUSR2, previous)
+            os.remove(path)
+
+    def test_template_frames(self):
+        try:
+            ObjectProxy(1) + 'x'
+        except TypeError as e:
+            tb = e.__traceback__.tb_next
+        self.assertEqual(tb.tb_frame.f_code.co_filename,
+                         '<pyoxy.objectproxy.__add__>')
+
+    def test_generated_frames(self):
+        frames = []
+
+        def fn(item):
+            frames.append(sys._getframe(1))
+            return item
+
+        list(PipelineProxy([1]).__map__(fn))
+        record(fn, io.BytesIO())(1)
+        for proxy in (ThreadSafeProxy(1), VersionedProxy(1)):
+            try:
+                proxy += 'x'
+            except TypeError as e:
+                tb = e.__traceback__.tb_next
+            self.assertTrue(
+                tb.tb_frame.f_code.co_filename.startswith('<pyoxy.'))
+        self.assertEqual(frames[0].f_code.co_filename,
+                         '<pyoxy.pipeline.fused.map>')
+        self.assertTrue(all(_is_proxy_frame(frame) for frame in frames))
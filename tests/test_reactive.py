@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import unittest
+
+from pyoxy import ComputedProxy, SourceProxy
+
+
+class Object(object):
+    pass
+
+
+class ReactiveTest(unittest.TestCase):
+
+    def computed(self, compute):
+        calls = []
+
+        def counted():
+            calls.append(1)
+            return compute()
+        return ComputedProxy(counted), calls
+
+    def test_items(self):
+        prices = SourceProxy({'a': 1, 'b': 2})
+        a, calls = self.computed(lambda: prices['a'] * 10)
+        self.assertEqual([], calls)
+        self.assertEqual(10, a)
+        self.assertEqual(10, a + 0)
+        self.assertEqual(1, len(calls))
+        prices['b'] = 3
+        self.assertEqual(10, a)
+        self.assertEqual(1, len(calls))
+        prices['a'] = 2
+        self.assertEqual(20, a)
+        self.assertEqual(2, len(calls))
+        del prices['a']
+        with self.assertRaises(KeyError):
+            a + 0
+
+    def test_attrs(self):
+        o = Object()
+        o.x = 1
+        o.y = 2
+        source = SourceProxy(o)
+        x, calls = self.computed(lambda: source.x + 1)
+        self.assertEqual(2, x)
+        source.y = 3
+        self.assertEqual(2, x)
+        self.assertEqual(1, len(calls))
+        source.x = 5
+        self.assertEqual(6, x)
+        self.assertEqual(2, len(calls))
+
+    def test_missing(self):
+        items = SourceProxy({})
+        attrs = SourceProxy(Object())
+
+        def compute():
+            try:
+                item = items['a']
+            except KeyError:
+                item = None
+            return item, getattr(attrs, 'x', None), hasattr(attrs, 'y')
+
+        value, calls = self.computed(compute)
+        self.assertEqual((None, None, False), value)
+        items['a'] = 1
+        self.assertEqual((1, None, False), value)
+        attrs.x = 2
+        self.assertEqual((1, 2, False), value)
+        attrs.y = 3
+        self.assertEqual((1, 2, True), value)
+        self.assertEqual(4, len(calls))
+
+    def test_whole_target(self):
+        values = SourceProxy({'a': 1, 'b': 2})
+        total, calls = self.computed(lambda: sum(values.values()))
+        count, count_calls = self.computed(lambda: len(values))
+        self.assertEqual(3, total)
+        self.assertEqual(2, count)
+        values['c'] = 3
+        self.assertEqual(6, total)
+        self.assertEqual(3, count)
+        self.assertEqual(2, len(calls))
+        values.__target__ = {'x': 10}
+        self.assertEqual(10, total)
+        self.assertEqual(1, count)
+
+    def test_changed(self):
+        items = SourceProxy([1, 2])
+        total, calls = self.computed(lambda: sum(items))
+        self.assertEqual(3, total)
+        items.append(3)
+        self.assertEqual(3, total)
+        items.__changed__()
+        self.assertEqual(6, total)
+
+    def test_chained(self):
+        source = SourceProxy({'a': 1, 'b': 1})
+        double, double_calls = self.computed(lambda: source['a'] * 2)
+        plus, plus_calls = self.computed(lambda: double + 1)
+        self.assertEqual(3, plus)
+        source['b'] = 2
+        self.assertEqual(3, plus)
+        self.assertEqual((1, 1), (len(double_calls), len(plus_calls)))
+        source['a'] = 2
+        self.assertEqual(5, plus)
+        self.assertEqual((2, 2), (len(double_calls), len(plus_calls)))
+
+    def test_dynamic_dependencies(self):
+        source = SourceProxy({'flag': True, 'a': 1, 'b': 2})
+        value, calls = self.computed(
+            lambda: source['a'] if source['flag'] else source['b'])
+        self.assertEqual(1, value)
+        source['flag'] = False
+        self.assertEqual(2, value)
+        source['a'] = 10  # no longer a dependency
+        self.assertEqual(2, value)
+        self.assertEqual(2, len(calls))
+
+    def test_in_place_op(self):
+        counter = SourceProxy(1)
+        double, calls = self.computed(lambda: counter * 2)
+        self.assertEqual(2, double)
+        counter += 1
+        self.assertEqual(4, double)
+
+    def test_read_only(self):
+        value = ComputedProxy(lambda: {'a': 1})
+        with self.assertRaises(TypeError):
+            value['a'] = 2
+        with self.assertRaises(TypeError):
+            del value['a']
+        with self.assertRaises(AttributeError):
+            value.attr = 1
+        with self.assertRaises(AttributeError):
+            del value.attr
+        self.assertEqual({'a': 1}, value.__target__)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from pyoxy import Recorder, ReplayMiss, record, replay
+
+
+class Backend(object):
+
+    version = 2
+
+    def __init__(self):
+        self.calls = 0
+        self.data = {'a': 1}
+
+    def query(self, sql, limit=None):
+        self.calls += 1
+        return [sql, limit]
+
+    def cursor(self):
+        return iter([(1, 'x'), (2, 'y')])
+
+    def fail(self):
+        raise ValueError('failed')
+
+
+class RecordingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'log')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def record(self, target, fn):
+        p = record(target, self.path)
+        try:
+            return fn(p)
+        finally:
+            p.__recorder__.close()
+
+    def test_record_replay(self):
+        def interact(p):
+            return [
+                p.version,
+                p.query('select', limit=1),
+                p.query('select', limit=2),
+                p.data['a'],
+                'a' in p.data,
+                len(p.data),
+                list(p.cursor()),
+                p.version + 1,
+            ]
+
+        backend = Backend()
+        expected = self.record(backend, interact)
+        self.assertEqual(2, backend.calls)
+        self.assertEqual(
+            [2, ['select', 1], ['select', 2], 1, True, 1,
+             [(1, 'x'), (2, 'y')], 3],
+            expected)
+        self.assertEqual(expected, interact(replay(self.path)))
+
+    def test_errors(self):
+        def interact(p):
+            with self.assertRaises(ValueError):
+                p.fail()
+            with self.assertRaises(AttributeError):
+                p.missing
+            with self.assertRaises(KeyError):
+                p.data['b']
+
+        self.record(Backend(), interact)
+        interact(replay(self.path))
+
+    def test_repeated_outcomes(self):
+        def interact(p):
+            p.calls = 5
+            first = p.calls
+            p.calls = 6
+            return first, p.calls
+
+        backend = Backend()
+        self.assertEqual((5, 6), self.record(backend, interact))
+        self.assertEqual(6, backend.calls)
+        p = replay(self.path)
+        self.assertEqual((5, 6), interact(p))
+        self.assertEqual(6, p.calls)
+
+    def test_operators(self):
+        def interact(p):
+            return [p + 1, 1 + p, -p, p == 2, p < 3, p * 2, hash(p),
+                    str(p), bool(p)]
+
+        expected = self.record(2, interact)
+        self.assertEqual(
+            [3, 3, -2, True, True, 4, hash(2), '2', True], expected)
+        self.assertEqual(expected, interact(replay(self.path)))
+
+    def test_miss(self):
+        self.record(Backend(), lambda p: p.query('a'))
+        p = replay(self.path)
+        with self.assertRaises(ReplayMiss):
+            p.query('b')
+        with self.assertRaises(ReplayMiss):
+            p.version
+
+    def test_empty_log(self):
+        self.record(Backend(), lambda p: None)
+        with self.assertRaises(ReplayMiss):
+            replay(self.path).version
+
+    def test_unpicklable_args(self):
+        class Arg(object):
+            def __reduce__(self):
+                raise TypeError()
+
+            def __repr__(self):
+                return 'Arg()'
+
+        def interact(p):
+            # Results containing other objects are proxied in turn.
+            return len(p.query(Arg())), p.query(Arg())[1]
+
+        self.assertEqual((2, None), self.record(Backend(), interact))
+        self.assertEqual((2, None), interact(replay(self.path)))
+
+    def test_unreproducible_args(self):
+        backend = Backend()
+
+        def interact(p):
+            with self.assertRaises(TypeError):
+                p.query(lambda: None)  # unpicklable, repr with an address
+
+        self.record(backend, interact)
+        self.assertEqual(0, backend.calls)
+
+    def test_set_args(self):
+        code = ('import sys, pyoxy; p = pyoxy.record([], sys.argv[1]); '
+                'p.count(set("abcdefgh")); p.count({"b": 1, "a": 2}); '
+                'p.__recorder__.close()')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONHASHSEED='1')
+        subprocess.check_call([sys.executable, '-c', code, self.path],
+                              cwd=root, env=env)
+        p = replay(self.path)
+        self.assertEqual(0, p.count(set('hgfedcba')))
+        self.assertEqual(0, p.count({'a': 2, 'b': 1}))
+
+    def test_file_object(self):
+        f = io.BytesIO()
+        p = record(Backend(), f)
+        p.version
+        p.__recorder__.close()
+        self.assertTrue(f.getvalue())
+        self.assertEqual(Recorder, type(p.__recorder__))
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import io
+import json
+import unittest
+
+from pyoxy import (
+    JSONEncoder, LazyProxy, ObjectProxy, dump_json, dump_msgpack, iter_json,
+    unwrap)
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def graph():
+    return ObjectProxy({
+        ObjectProxy('items'): ObjectProxy([
+            ObjectProxy({'id': ObjectProxy(i), 'tags': ObjectProxy(('a',))})
+            for i in range(5)]),
+        'lazy': LazyProxy(lambda: {'x': 1.5}),
+        'none': None,
+    })
+
+
+PLAIN = {
+    'items': [{'id': i, 'tags': ['a']} for i in range(5)],
+    'lazy': {'x': 1.5},
+    'none': None,
+}
+
+
+class SerializeTest(unittest.TestCase):
+
+    def test_unwrap(self):
+        target = []
+        self.assertIs(unwrap(ObjectProxy(ObjectProxy(target))), target)
+        self.assertIs(unwrap(target), target)
+
+    def test_encoder(self):
+        self.assertEqual(json.loads(json.dumps(graph()['items'],
+                                               cls=JSONEncoder)),
+                         PLAIN['items'])
+        self.assertRaises(TypeError, json.dumps, object(), cls=JSONEncoder)
+
+    def test_iter_json(self):
+        for chunk_size in (1, 2, 1000):
+            self.assertEqual(json.loads(''.join(iter_json(graph(),
+                                                          chunk_size))),
+                             PLAIN)
+        pieces = list(iter_json(ObjectProxy(list(range(10))), chunk_size=3))
+        self.assertEqual(pieces[0], '[')
+        self.assertEqual(pieces[1], '0, 1, 2')
+        self.assertEqual(len(pieces), 9)
+        self.assertEqual(json.loads(''.join(pieces)), list(range(10)))
+
+    def test_iter_json_options(self):
+        self.assertEqual(''.join(iter_json([])), '[]')
+        self.assertEqual(''.join(iter_json({})), '{}')
+        self.assertEqual(''.join(iter_json(ObjectProxy('x'))), '"x"')
+        self.assertEqual(
+            ''.join(iter_json({'b': 1, 'a': [2, 3]}, 1, sort_keys=True,
+                              separators=(',', ':'))),
+            '{"a":[2,3],"b":1}')
+        self.assertEqual(json.loads(''.join(iter_json(graph(), indent=2))),
+                         PLAIN)
+        self.assertEqual(''.join(iter_json(iter([1]), indent=1)), '[\n 1\n]')
+
+    def test_iterator(self):
+        consumed = []
+
+        def rows():
+            for i in range(6):
+                consumed.append(i)
+                yield ObjectProxy({'i': i})
+
+        pieces = iter_json(rows(), chunk_size=2)
+        self.assertEqual(next(pieces), '[')
+        self.assertEqual(next(pieces), '{"i": 0}, {"i": 1}')
+        self.assertEqual(consumed, [0, 1])
+        self.assertEqual(json.loads('[{"i": 0}, {"i": 1}' + ''.join(pieces)),
+                         [{'i': i} for i in range(6)])
+
+    def test_dump_json(self):
+        f = io.StringIO()
+        dump_json(graph(), f, chunk_size=2)
+        self.assertEqual(json.loads(f.getvalue()), PLAIN)
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not available')
+    def test_msgpack(self):  # pragma: no cover
+        for chunk_size in (1, 1000):
+            f = io.BytesIO()
+            dump_msgpack(graph(), f, chunk_size)
+            self.assertEqual(msgpack.unpackb(f.getvalue()), PLAIN)
+        f = io.BytesIO()
+        dump_msgpack(iter([ObjectProxy(1), 2]), f)
+        self.assertEqual(msgpack.unpackb(f.getvalue()), [1, 2])
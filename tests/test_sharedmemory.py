@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import array
+import gc
+import multiprocessing
+import struct
+import unittest
+
+from pyoxy import SharedMemoryProxy, share
+from pyoxy.sharedmemory import (
+    _segments, buffer_view, numpy_view, struct_view)
+
+try:  # pragma: no cover
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    shared_memory = None
+
+try:  # pragma: no cover
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+def _increment(name):
+    p = SharedMemoryProxy(name, buffer_view('i'), 12)
+    for i in range(len(p)):
+        p[i] += 1
+
+
+@unittest.skipIf(shared_memory is None, 'shared_memory is not available')
+class SharedMemoryProxyTest(unittest.TestCase):
+
+    def test_bytes(self):
+        p = share(b'abc')
+        self.assertEqual(b'abc', p.tobytes())
+        self.assertEqual(3, len(p))
+        p[0] = ord(b'x')
+        q = SharedMemoryProxy(p.__shm_name__, size=3)
+        self.assertEqual(b'xbc', bytes(q))
+
+    def test_lazy_attach_and_refcount(self):
+        p = share(array.array('i', [1, 2, 3]), buffer_view('i'))
+        name = p.__shm_name__
+        self.assertEqual(1, _segments[name].refs)
+        q = SharedMemoryProxy(name, buffer_view('i'), 12)
+        self.assertEqual(1, _segments[name].refs)
+        self.assertEqual([1, 2, 3], list(q))
+        self.assertEqual(2, _segments[name].refs)
+        q.__detach__()
+        q.__detach__()
+        self.assertEqual(1, _segments[name].refs)
+        self.assertEqual(3, q[2])  # attached again
+        del q
+        gc.collect()
+        self.assertEqual(1, _segments[name].refs)
+        del p
+        gc.collect()
+        self.assertNotIn(name, _segments)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name)
+
+    def test_shape(self):
+        p = share(array.array('i', range(6)), buffer_view('i', (2, 3)))
+        self.assertEqual((2, 3), p.shape)
+        self.assertEqual(5, p[1, 2])
+
+    def test_struct(self):
+        record = struct.Struct('<id')
+        p = share(record.pack(1, 0.5) + record.pack(2, 1.5),
+                  struct_view('<id'))
+        self.assertEqual(2, len(p))
+        self.assertEqual((2, 1.5), p[-1])
+        self.assertEqual([(1, 0.5), (2, 1.5)], list(p))
+        p[0] = (3, 2.5)
+        self.assertEqual([(3, 2.5)], p[:1])
+        with self.assertRaises(IndexError):
+            p[2]
+
+    @unittest.skipIf(numpy is None, 'numpy is not available')
+    def test_numpy(self):  # pragma: no cover
+        data = numpy.arange(6, dtype='i8')
+        p = share(data, numpy_view('i8', (2, 3)))
+        self.assertEqual(15, p.sum())
+        q = SharedMemoryProxy(p.__shm_name__, numpy_view('i8', (2, 3)))
+        q[0, 0] = 10
+        self.assertEqual(10, p[0, 0])
+
+    @unittest.skipIf('fork' not in multiprocessing.get_all_start_methods(),
+                     'fork is not available')
+    def test_other_process(self):
+        p = share(array.array('i', [1, 2, 3]), buffer_view('i'))
+        context = multiprocessing.get_context('fork')
+        process = context.Process(target=_increment, args=(p.__shm_name__,))
+        process.start()
+        process.join()
+        self.assertEqual(0, process.exitcode)
+        self.assertEqual([2, 3, 4], list(p))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyoxy import SpillManager, SpillProxy, spill
+
+try:  # pragma: no cover
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+
+class SpillProxyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.manager = SpillManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def spill(self, obj, name, format='pickle', **kwargs):
+        return spill(obj, self.path(name), format, self.manager, **kwargs)
+
+    def is_resident(self, p):
+        try:
+            object.__getattribute__(p, '__target__')
+        except AttributeError:
+            return False
+        return True
+
+    def test_lazy_load(self):
+        p = self.spill({'a': [1, 2]}, 'a.pickle')
+        self.assertFalse(self.is_resident(p))
+        self.assertEqual(0, self.manager.resident)
+        self.assertEqual([1, 2], p['a'])
+        self.assertTrue(self.is_resident(p))
+        self.assertEqual(os.path.getsize(self.path('a.pickle')),
+                         self.manager.resident)
+        self.assertEqual(['a'], list(p.keys()))
+
+    def test_bytes(self):
+        p = self.spill(b'abcd', 'a.bin', 'bytes')
+        self.assertEqual(4, len(p))
+        self.assertEqual(b'bc', p[1:3])
+        self.assertEqual(4, self.manager.resident)
+        self.assertEqual(b'', self.spill(b'', 'b.bin', 'bytes')[:])
+
+    @unittest.skipIf(numpy is None, 'numpy is not available')
+    def test_numpy(self):  # pragma: no cover
+        p = self.spill(numpy.arange(10), 'a.npy', 'numpy')
+        self.assertEqual(45, p.sum())
+        self.assertEqual(p.nbytes, self.manager.resident)
+
+    def test_evict_lru(self):
+        self.manager.budget = 8
+        p1 = self.spill(b'1111', '1.bin', 'bytes')
+        p2 = self.spill(b'2222', '2.bin', 'bytes')
+        p3 = self.spill(b'3333', '3.bin', 'bytes')
+        self.assertEqual(b'1', p1[:1])
+        self.assertEqual(b'2', p2[:1])
+        self.assertEqual(b'1', p1[:1])  # p2 becomes least recently used
+        self.assertEqual(b'3', p3[:1])
+        self.assertTrue(self.is_resident(p1))
+        self.assertFalse(self.is_resident(p2))
+        self.assertTrue(self.is_resident(p3))
+        self.assertEqual(2, len(self.manager))
+        self.assertEqual(8, self.manager.resident)
+        self.assertEqual(b'2', p2[:1])  # reloaded
+        self.assertFalse(self.is_resident(p1))
+
+    def test_writeback(self):
+        p = self.spill({}, 'a.pickle', writeback=True)
+        p['a'] = 1
+        del p.__target__
+        self.assertFalse(self.is_resident(p))
+        self.assertEqual(0, self.manager.resident)
+        self.assertEqual({'a': 1}, SpillProxy(self.path('a.pickle')).copy())
+
+    def test_writeback_error(self):
+        p = self.spill({'a': 1}, 'a.pickle', writeback=True)
+        p['f'] = lambda: None  # can't be pickled
+        with self.assertRaises(Exception):
+            del p.__target__
+        self.assertEqual(os.listdir(self.dir), ['a.pickle'])
+        self.assertEqual({'a': 1}, SpillProxy(self.path('a.pickle')).copy())
+
+    def test_reload_tracked(self):
+        p = self.spill([1], 'a.pickle')
+        p[0]
+        del p.__target__
+        self.assertEqual(0, len(self.manager))
+        p[0]
+        self.assertEqual(1, len(self.manager))
+        self.assertGreater(self.manager.resident, 0)
+
+    def test_no_writeback(self):
+        p = self.spill({}, 'a.pickle')
+        p['a'] = 1
+        del p.__target__
+        self.assertEqual({}, p.__target__)
+
+    def test_set_target(self):
+        p = SpillProxy(self.path('missing.pickle'), manager=self.manager)
+        p.__target__ = b'abc'
+        self.assertEqual(b'abc', p.__target__)
+        self.assertEqual(3, self.manager.resident)
+
+    def test_forget_collected(self):
+        p = self.spill([1], 'a.pickle')
+        p[0]
+        del p
+        gc.collect()
+        self.assertEqual(0, len(self.manager))
+        self.assertEqual(0, self.manager.resident)
+
+    def test_invalid_format(self):
+        with self.assertRaises(ValueError):
+            SpillProxy(self.path('a'), 'csv')
+        with self.assertRaises(ValueError):
+            SpillProxy(self.path('a'), 'bytes', writeback=True)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import sys
+import threading
+import unittest
+
+from pyoxy import ThreadSafeProxy
+
+
+class ThreadSafeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.interval)
+
+    def hammer(self, fn, threads=8):
+        workers = [threading.Thread(target=fn) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def test_in_place_ops(self):
+        p = ThreadSafeProxy(0)
+
+        def add():
+            q = p  # in-place ops rebind the name to what they return
+            for _ in range(2000):
+                q += 1
+                q -= 2
+                q += 2
+
+        self.hammer(add)
+        self.assertEqual(p, 8 * 2000)
+        self.assertIsInstance(p, int)
+
+        for target in (3, ThreadSafeProxy(3)):
+            p = target
+            p *= 4
+            p **= 2
+            p //= 5
+            p %= 11
+            p <<= 2
+            p >>= 1
+            p &= 6
+            p |= 1
+            p ^= 8
+            self.assertEqual(p, 13)
+        self.assertIs(type(p), ThreadSafeProxy)
+        p /= 2
+        self.assertEqual(p, 6.5)
+
+    def test_mutable_target(self):
+        target = []
+        p = ThreadSafeProxy(target)
+        p += [1]
+        self.assertIs(p.__target__, target)
+        self.assertEqual(target, [1])
+
+    def test_update(self):
+        p = ThreadSafeProxy(0)
+        self.hammer(lambda: [p.__update__(lambda x: x + 1)
+                             for _ in range(2000)])
+        self.assertEqual(p.__target__, 8 * 2000)
+        self.assertEqual(p.__update__(str), '16000')
+
+    def test_compare_and_set(self):
+        a, b = object(), object()
+        p = ThreadSafeProxy(a)
+        self.assertFalse(p.__compare_and_set__(b, b))
+        self.assertIs(p.__target__, a)
+        self.assertTrue(p.__compare_and_set__(a, b))
+        self.assertIs(p.__target__, b)
+
+    def test_reads(self):
+        p = ThreadSafeProxy([1, 2, 3])
+        self.assertEqual(len(p), 3)
+        self.assertEqual(p.count(2), 1)
+        p.append(4)
+        self.assertEqual(p[-1], 4)
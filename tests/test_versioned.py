@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import copy
+import gc
+import threading
+import unittest
+import weakref
+
+from pyoxy import VersionedProxy
+
+
+class Object(object):
+    pass
+
+
+class VersionedTest(unittest.TestCase):
+
+    def test_items(self):
+        first = {'a': 1}
+        p = VersionedProxy(first)
+        version = p.__version__
+        p['b'] = 2
+        del p['a']
+        self.assertEqual(first, {'a': 1})
+        self.assertEqual(p, {'b': 2})
+        self.assertEqual(p.__version__, version + 2)
+
+    def test_attrs(self):
+        first = Object()
+        first.a = 1
+        p = VersionedProxy(first)
+        p.b = 2
+        del p.a
+        self.assertEqual(vars(first), {'a': 1})
+        self.assertEqual(vars(p.__target__), {'b': 2})
+        self.assertEqual(p.b, 2)
+
+    def test_in_place_ops(self):
+        first = [1]
+        p = VersionedProxy(first)
+        p += [2]
+        p *= 2
+        self.assertEqual(first, [1])
+        self.assertEqual(p, [1, 2, 1, 2])
+        self.assertIs(type(p), VersionedProxy)
+
+        p = VersionedProxy(3)
+        p **= 2
+        p -= 1
+        self.assertEqual(p, 8)
+
+    def test_snapshot(self):
+        p = VersionedProxy({'a': 1, 'b': 1})
+        with p.__snapshot__() as s:
+            p['a'] = 2
+            p['b'] = 2
+            self.assertEqual(s, {'a': 1, 'b': 1})
+        with p.__snapshot__() as s:
+            self.assertEqual(s, {'a': 2, 'b': 2})
+
+    def test_transaction(self):
+        p = VersionedProxy({'a': 1, 'b': 1})
+        version = p.__version__
+        with p.__snapshot__() as s:
+            with p.__transaction__() as draft:
+                draft['a'] = 2
+                draft['b'] = 2
+                self.assertEqual(p, {'a': 1, 'b': 1})
+            self.assertEqual(s, {'a': 1, 'b': 1})
+        self.assertEqual(p, {'a': 2, 'b': 2})
+        self.assertEqual(p.__version__, version + 1)
+
+        with self.assertRaises(ValueError):
+            with p.__transaction__() as draft:
+                draft['a'] = 3
+                raise ValueError
+        self.assertEqual(p, {'a': 2, 'b': 2})
+        self.assertEqual(p.__version__, version + 1)
+
+    def test_nested_writes(self):
+        p = VersionedProxy({'a': 1})
+        version = p.__version__
+        with p.__transaction__() as draft:
+            p['a'] = 2
+            p['b'] = 2
+            self.assertEqual(draft, {'a': 2, 'b': 2})
+            self.assertEqual(p, {'a': 1})
+        self.assertEqual(p, {'a': 2, 'b': 2})
+        self.assertEqual(p.__version__, version + 1)
+
+        n = VersionedProxy(1)
+        with n.__transaction__():
+            n += 1
+            n += 1
+        self.assertEqual(n, 3)
+
+    def test_reclaim(self):
+        p = VersionedProxy(Object())
+        first = weakref.ref(p.__target__)
+        with p.__snapshot__():
+            p.a = 1
+            gc.collect()
+            self.assertIsNotNone(first())
+        gc.collect()
+        self.assertIsNone(first())
+
+    def test_copier(self):
+        p = VersionedProxy({'a': [1]}, copier=copy.deepcopy)
+        with p.__snapshot__() as s:
+            with p.__transaction__() as draft:
+                draft['a'].append(2)
+            self.assertEqual(s, {'a': [1]})
+        self.assertEqual(p, {'a': [1, 2]})
+
+    def test_concurrent(self):
+        p = VersionedProxy({'a': 0, 'b': 0})
+        stop = threading.Event()
+        torn = []
+
+        def write():
+            for i in range(1, 2000):
+                with p.__transaction__() as draft:
+                    draft['a'] = i
+                    draft['b'] = -i
+            stop.set()
+
+        def read():
+            while not stop.is_set():
+                with p.__snapshot__() as s:
+                    if s['a'] != -s['b']:
+                        torn.append(dict(s))
+
+        threads = [threading.Thread(target=write)] + [
+            threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(torn, [])
+        self.assertEqual(p, {'a': 1999, 'b': -1999})
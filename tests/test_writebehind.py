@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2013 Jacek Mitręga
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+#     http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import division, unicode_literals
+
+import threading
+import time
+import unittest
+
+from pyoxy import WriteBehindProxy
+
+
+class Object(object):
+    pass
+
+
+class Store(dict):
+
+    def __init__(self, *args, **kwargs):
+        super(Store, self).__init__(*args, **kwargs)
+        self.updates = []
+
+    def update(self, other):
+        self.updates.append(dict(other))
+        super(Store, self).update(other)
+
+
+class Mapping(object):
+
+    def __init__(self):
+        self.items = {}
+
+    def __getitem__(self, key):
+        return self.items[key]
+
+    def __setitem__(self, key, value):
+        self.items[key] = value
+
+
+class WriteBehindProxyTest(unittest.TestCase):
+
+    def test_items(self):
+        o = Store({'a': 1, 'b': 2})
+        p = WriteBehindProxy(o)
+        p['a'] = 10
+        p['a'] = 11
+        p['c'] = 3
+        del p['b']
+        self.assertEqual({'a': 1, 'b': 2}, o)
+        self.assertEqual(11, p['a'])
+        self.assertEqual(3, p['c'])
+        self.assertIn('c', p)
+        self.assertNotIn('b', p)
+        with self.assertRaises(KeyError):
+            p['b']
+        p.__flush__()
+        self.assertEqual({'a': 11, 'c': 3}, o)
+        self.assertEqual([{'a': 11, 'c': 3}], o.updates)
+        self.assertEqual({}, p.__pending_items__)
+
+    def test_items_without_update(self):
+        o = Mapping()
+        p = WriteBehindProxy(o)
+        p[1] = 1
+        self.assertEqual({}, o.items)
+        p.__flush__()
+        self.assertEqual({1: 1}, o.items)
+
+    def test_other_reads_flush(self):
+        o = {}
+        p = WriteBehindProxy(o)
+        p[1] = 1
+        self.assertEqual(1, len(p))
+        self.assertEqual({1: 1}, o)
+        p[2] = 2
+        self.assertEqual([1, 2], sorted(p.keys()))
+
+    def test_attrs(self):
+        o = Object()
+        o.a = 1
+        p = WriteBehindProxy(o)
+        p.a = 2
+        p.b = 3
+        self.assertEqual(1, o.a)
+        self.assertEqual(2, p.a)
+        self.assertEqual(3, p.b)
+        del p.a
+        with self.assertRaises(AttributeError):
+            p.a
+        p.__flush__()
+        self.assertFalse(hasattr(o, 'a'))
+        self.assertEqual(3, o.b)
+
+    def test_unhashable_key(self):
+        o = [0, 1, 2]
+        p = WriteBehindProxy(o)
+        p[0:2] = [5]
+        self.assertEqual([5, 2], o)
+        self.assertEqual([5], p[0:1])
+
+    def test_flush_on_size(self):
+        o = Store()
+        p = WriteBehindProxy(o, max_pending=2)
+        p[1] = 1
+        p[1] = 1
+        self.assertEqual({}, o)
+        p[2] = 2
+        self.assertEqual({1: 1, 2: 2}, o)
+
+    def test_flush_on_time(self):
+        flushed = threading.Event()
+
+        class TimedStore(Store):
+            def update(self, other):
+                super(TimedStore, self).update(other)
+                flushed.set()
+
+        o = TimedStore()
+        p = WriteBehindProxy(o, flush_interval=0.01)
+        p[1] = 1
+        self.assertTrue(flushed.wait(5))
+        self.assertEqual({1: 1}, o)
+        self.assertIsNone(p.__timer__)
+
+    def test_flush_on_exit(self):
+        o = Store()
+        with WriteBehindProxy(o) as p:
+            p[1] = 1
+            self.assertEqual({}, o)
+        self.assertEqual({1: 1}, o)
+
+    def test_flush_error(self):
+        o = {}
+        p = WriteBehindProxy(o)
+        del p[1]
+        p[2] = 2
+        with self.assertRaises(KeyError):
+            p.__flush__()
+        self.assertEqual(1, len(p))
+        self.assertEqual({2: 2}, o)
+        p.__target__ = {}
+        self.assertEqual(0, len(p))
+
+    def test_timer_flush_error(self):
+        o = {}
+        p = WriteBehindProxy(o, flush_interval=0.01)
+        del p[1]
+        deadline = time.time() + 5
+        while p.__flush_error__ is None and time.time() < deadline:
+            time.sleep(0.01)
+        with self.assertRaises(KeyError):
+            p.__flush__()
+        p.__flush__()
+
+    def test_exit_after_flush_error(self):
+        class Resource(dict):
+            exits = []
+
+            def __enter__(self):
+                return 'entered'
+
+            def __exit__(self, *exc_info):
+                self.exits.append(exc_info[0])
+
+        o = Resource()
+        with self.assertRaises(KeyError):
+            with WriteBehindProxy(o) as p:
+                self.assertIsInstance(p, WriteBehindProxy)
+                del p[1]
+        self.assertEqual(Resource.exits, [KeyError])
+
+    def test_replace_target_flushes(self):
+        o1 = {}
+        o2 = {}
+        p = WriteBehindProxy(o1)
+        p[1] = 1
+        p.__target__ = o2
+        self.assertEqual({1: 1}, o1)
+        self.assertIs(o2, p.__target__)